@@ -5,6 +5,7 @@ Runs all unit tests and reports results
 import subprocess
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 # List of test files to run (excluding database tests that require connection)
 TEST_FILES = [
@@ -19,34 +20,38 @@ TEST_FILES = [
     'test_e2e_no_db.py',
 ]
 
+# Test files are independent processes, so run several at once. Half the
+# cores, each child limited to one OpenMP thread, so files run side by side
+# still finish within the 30s per-file timeout sized for running alone
+MAX_WORKERS = max(1, (os.cpu_count() or 1) // 2)
+CHILD_ENV = dict(os.environ, OMP_NUM_THREADS='1')
+
 def run_test_file(test_file):
-    """Run a single test file and return success status"""
-    print(f"\n{'=' * 60}")
-    print(f"Running: {test_file}")
-    print('=' * 60)
-    
+    """Run a single test file and return (success, captured output)"""
     try:
         result = subprocess.run(
             [sys.executable, test_file],
             cwd=os.path.dirname(os.path.abspath(__file__)),
-            capture_output=False,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            env=CHILD_ENV,
             timeout=30
         )
         
         success = result.returncode == 0
+        output = result.stdout
         if success:
-            print(f"✓ {test_file} PASSED")
+            output += f"✓ {test_file} PASSED\n"
         else:
-            print(f"✗ {test_file} FAILED (exit code: {result.returncode})")
+            output += f"✗ {test_file} FAILED (exit code: {result.returncode})\n"
         
-        return success
+        return success, output
         
     except subprocess.TimeoutExpired:
-        print(f"✗ {test_file} TIMEOUT")
-        return False
+        return False, f"✗ {test_file} TIMEOUT\n"
     except Exception as e:
-        print(f"✗ {test_file} ERROR: {e}")
-        return False
+        return False, f"✗ {test_file} ERROR: {e}\n"
 
 
 def main():
@@ -58,13 +63,26 @@ def main():
     
     results = {}
     
-    for test_file in TEST_FILES:
-        test_path = os.path.join(os.path.dirname(__file__), test_file)
-        if os.path.exists(test_path):
-            results[test_file] = run_test_file(test_file)
-        else:
-            print(f"⚠ {test_file} not found, skipping")
-            results[test_file] = None
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = {}
+        for test_file in TEST_FILES:
+            test_path = os.path.join(os.path.dirname(__file__), test_file)
+            if os.path.exists(test_path):
+                futures[test_file] = pool.submit(run_test_file, test_file)
+        
+        # Report in list order so the output of each file stays together
+        for test_file in TEST_FILES:
+            if test_file not in futures:
+                print(f"⚠ {test_file} not found, skipping")
+                results[test_file] = None
+                continue
+            
+            success, output = futures[test_file].result()
+            print(f"\n{'=' * 60}")
+            print(f"Running: {test_file}")
+            print('=' * 60)
+            print(output, end='')
+            results[test_file] = success
     
     # Print summary
     print("\n" + "=" * 60)
@@ -0,0 +1,38 @@
+"""
+Fast cosine similarity for speaker embeddings
+Uses numba-compiled loops (normalize + dot fused in one pass) when numba
+is installed, plain numpy otherwise
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _cosine_pair(a, b):
+        dot = 0.0
+        norm_a = 0.0
+        norm_b = 0.0
+        for i in range(a.shape[0]):
+            dot += a[i] * b[i]
+            norm_a += a[i] * a[i]
+            norm_b += b[i] * b[i]
+        return dot / (np.sqrt(norm_a) * np.sqrt(norm_b) + 1e-12)
+
+
+def cosine_similarity(a, b):
+    """
+    Cosine similarity of two 1-D vectors (same result as sklearn's
+    cosine_similarity on a single pair, without its validation overhead)
+    """
+    a = np.ascontiguousarray(a).ravel()
+    b = np.ascontiguousarray(b).ravel()
+    if njit is not None:
+        return float(_cosine_pair(a, b))
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b) + 1e-12))
+
@@ -13,9 +13,56 @@ from sklearn.preprocessing import normalize
 from sklearn.metrics.pairwise import euclidean_distances
 import pickle
 import os
+import io
+import json
+import struct
 import hashlib
+import threading
 import speech_recognition as sr
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from difflib import SequenceMatcher
+import mel_features
+
+# xxh3 hashes the audio much faster than blake2b; both are content-addressed keys
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Number of recent fingerprints kept, keyed by audio content
+FINGERPRINT_CACHE_SIZE = 256
+
+# Snapshot of all enrolled fingerprints as one float32 (N, D) file plus an index,
+# so startup reads one file instead of unpickling every speaker_*.pkl
+SNAPSHOT_MATRIX_FILE = 'fingerprints.f32'
+SNAPSHOT_INDEX_FILE = 'fingerprints_index.json'
+
+
+def _wav_bytes(audio_f32, sample_rate):
+    """
+    Encode float audio (-1..1) as a 16-bit mono PCM WAV file in memory
+    Writes the 44-byte RIFF header directly instead of going through the wave module
+    """
+    pcm = (audio_f32 * 32767).astype('<i2').tobytes()
+    n = len(pcm)
+    header = struct.pack('<4sI4s4sIHHIIHH4sI',
+                         b'RIFF', 36 + n, b'WAVE',
+                         b'fmt ', 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+                         b'data', n)
+    return header + pcm
+
+
+def _audio_digest(audio_data):
+    """Content hash of an audio array (dtype and shape included)"""
+    data = np.ascontiguousarray(audio_data)
+    buffer = memoryview(data).cast('B')
+    if xxhash is not None:
+        digest = xxhash.xxh3_128_digest(buffer)
+    else:
+        digest = hashlib.blake2b(buffer, digest_size=16).digest()
+    return digest, data.dtype.str, data.shape
+
 
 class HybridVoiceVerification:
     """
@@ -34,12 +81,181 @@ class HybridVoiceVerification:
         self.VOICE_DISTANCE_THRESHOLD = 0.35  # Voice signature threshold
         self.PHRASE_SIMILARITY_THRESHOLD = 0.80  # 80% phrase match required
         
+        # Subtract the mean of all enrolled fingerprints (and re-normalize) before
+        # comparing, which spreads different speakers further apart. Off by default:
+        # VOICE_DISTANCE_THRESHOLD was tuned on uncentered fingerprints and must be
+        # re-tuned before enabling. Needs a few speakers for a meaningful mean.
+        self.CENTER_FINGERPRINTS = False
+        self.MIN_SPEAKERS_FOR_CENTERING = 3
+        
         # Initialize speech recognizer
         self.recognizer = sr.Recognizer()
         
+        # Speech recognition is a network round-trip; run it in the background
+        # while the voice fingerprint is extracted on the request thread
+        self._speech_executor = ThreadPoolExecutor(max_workers=4)
+        
+        # Recently extracted fingerprints, so retried requests with the same
+        # audio skip feature extraction
+        self._fingerprint_cache = OrderedDict()
+        self._fingerprint_cache_lock = threading.Lock()
+        
+        # Enrolled speakers kept in memory: {user_id: enrolled_data}
+        # Loaded once here (from the snapshot when it is current), updated on enroll/delete
+        self._enrolled_lock = threading.Lock()
+        self._enrolled = self._load_fingerprint_snapshot()
+        snapshot_current = self._enrolled is not None
+        if not snapshot_current:
+            self._enrolled = self._load_enrollments()
+        
+        # (user_ids, fingerprint_matrix, phrases, centering) stacked from self._enrolled
+        self._fingerprint_index = self._build_fingerprint_index()
+        if not snapshot_current:
+            self._save_fingerprint_snapshot()
+        
         print("✓ Hybrid Voice Verification System initialized")
         print(f"  Voice threshold: {self.VOICE_DISTANCE_THRESHOLD}")
         print(f"  Phrase threshold: {self.PHRASE_SIMILARITY_THRESHOLD}")
+        print(f"  Enrolled speakers: {len(self._enrolled)}")
+    
+    def _load_enrollments(self):
+        """Load every enrolled speaker from the models directory"""
+        enrolled = {}
+        for model_file in os.listdir(self.models_dir):
+            if model_file.endswith('.pkl'):
+                user_id = model_file.replace('speaker_', '').replace('.pkl', '')
+                with open(os.path.join(self.models_dir, model_file), 'rb') as f:
+                    enrolled[user_id] = pickle.load(f)
+        return enrolled
+    
+    def _load_fingerprint_snapshot(self):
+        """
+        Load enrollments from the fingerprint snapshot
+        
+        Returns:
+            {user_id: enrolled_data}, or None if the snapshot is missing or
+            older than the speaker_*.pkl files (which remain the source of truth)
+        """
+        index_path = os.path.join(self.models_dir, SNAPSHOT_INDEX_FILE)
+        matrix_path = os.path.join(self.models_dir, SNAPSHOT_MATRIX_FILE)
+        try:
+            snapshot_mtime = os.stat(index_path).st_mtime_ns
+            with open(index_path, 'r') as f:
+                index = json.load(f)
+            user_ids = index['user_ids']
+            phrases = index['phrases']
+            
+            # One directory listing (no unpickling) to check the snapshot is current
+            model_mtimes = {}
+            with os.scandir(self.models_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.pkl'):
+                        user_id = entry.name.replace('speaker_', '').replace('.pkl', '')
+                        model_mtimes[user_id] = entry.stat().st_mtime_ns
+            if (set(model_mtimes) != set(user_ids) or
+                    any(mtime > snapshot_mtime for mtime in model_mtimes.values())):
+                return None
+            
+            matrix = np.fromfile(matrix_path, dtype=np.float32).reshape(len(user_ids), index['dim'])
+        except (OSError, ValueError, KeyError):
+            return None
+        
+        return {
+            user_id: {
+                'user_id': user_id,
+                'fingerprint': matrix[i],
+                'enrollment_phrase': phrases[i]
+            }
+            for i, user_id in enumerate(user_ids)
+        }
+    
+    def _save_fingerprint_snapshot(self):
+        """Write the current fingerprint index as the startup snapshot"""
+        user_ids, matrix, phrases, _ = self._fingerprint_index
+        index_path = os.path.join(self.models_dir, SNAPSHOT_INDEX_FILE)
+        matrix_path = os.path.join(self.models_dir, SNAPSHOT_MATRIX_FILE)
+        try:
+            # Matrix first, index last: the index mtime marks the snapshot as current
+            with open(matrix_path + '.tmp', 'wb') as f:
+                if matrix is not None:
+                    matrix.tofile(f)
+            os.replace(matrix_path + '.tmp', matrix_path)
+            
+            with open(index_path + '.tmp', 'w') as f:
+                json.dump({
+                    'user_ids': user_ids,
+                    'phrases': phrases,
+                    'dim': matrix.shape[1] if matrix is not None else 0
+                }, f)
+            os.replace(index_path + '.tmp', index_path)
+        except OSError as e:
+            print(f"⚠️  Could not write fingerprint snapshot: {str(e)}")
+    
+    def _update_fingerprint_index(self):
+        """Rebuild the stacked fingerprints and snapshot after enroll/delete"""
+        self._fingerprint_index = self._build_fingerprint_index()
+        self._save_fingerprint_snapshot()
+    
+    def _build_fingerprint_index(self):
+        """
+        Stack all enrolled fingerprints into one (N, D) float32 matrix
+        Fingerprints are L2-normalized, so matrix @ query gives every cosine at once
+        
+        Returns:
+            (user_ids, matrix, phrases, centering) - centering is
+            (global_mean, centered_matrix) when CENTER_FINGERPRINTS applies, else None
+        """
+        enrolled = list(self._enrolled.items())
+        user_ids = [uid for uid, _ in enrolled]
+        phrases = [data.get('enrollment_phrase', '') for _, data in enrolled]
+        if not enrolled:
+            return user_ids, None, phrases, None
+        matrix = np.vstack([data['fingerprint'] for _, data in enrolled]).astype(np.float32)
+        
+        centering = None
+        if self.CENTER_FINGERPRINTS and len(user_ids) >= self.MIN_SPEAKERS_FOR_CENTERING:
+            global_mean = matrix.mean(axis=0)
+            centered = matrix - global_mean
+            centered /= np.linalg.norm(centered, axis=1, keepdims=True) + 1e-8
+            centering = (global_mean, centered)
+        return user_ids, matrix, phrases, centering
+    
+    @staticmethod
+    def _center_fingerprint(fingerprint, global_mean):
+        """Subtract the enrolled global mean and re-normalize"""
+        centered = np.asarray(fingerprint, dtype=np.float32) - global_mean
+        return centered / (np.linalg.norm(centered) + 1e-8)
+    
+    @property
+    def fingerprint_dim(self):
+        """Length of an enrolled fingerprint, or None if nobody is enrolled yet"""
+        matrix = self._fingerprint_index[1]
+        return matrix.shape[1] if matrix is not None else None
+    
+    @staticmethod
+    def _normalize_fingerprint(fingerprint):
+        """L2-normalize a client-supplied fingerprint the same way as enrolled ones"""
+        fingerprint = np.asarray(fingerprint, dtype=np.float32)
+        return fingerprint / (np.linalg.norm(fingerprint) + 1e-8)
+    
+    def get_voice_fingerprint(self, audio_data, sample_rate=16000):
+        """Voice fingerprint for audio_data, memoized by audio content hash"""
+        key = (_audio_digest(audio_data), sample_rate)
+        
+        with self._fingerprint_cache_lock:
+            fingerprint = self._fingerprint_cache.get(key)
+            if fingerprint is not None:
+                self._fingerprint_cache.move_to_end(key)
+                return fingerprint
+        
+        fingerprint = self.extract_voice_fingerprint(audio_data, sample_rate)
+        
+        with self._fingerprint_cache_lock:
+            self._fingerprint_cache[key] = fingerprint
+            if len(self._fingerprint_cache) > FINGERPRINT_CACHE_SIZE:
+                self._fingerprint_cache.popitem(last=False)
+        
+        return fingerprint
     
     def extract_voice_fingerprint(self, audio_data, sample_rate=16000):
         """Extract voice signature (same as before)"""
@@ -93,7 +309,7 @@ class HybridVoiceVerification:
             ])
             
             # 3. MFCC features
-            mfccs = librosa.feature.mfcc(y=audio_data, sr=sample_rate, n_mfcc=20)
+            mfccs = mel_features.mfcc(audio_data, sample_rate, n_mfcc=20)
             
             features.extend([
                 np.mean(mfccs, axis=1).tolist(),
@@ -126,22 +342,8 @@ class HybridVoiceVerification:
         Returns the recognized phrase
         """
         try:
-            # Convert numpy array to AudioData format
-            import io
-            import wave
-            
-            # Create WAV in memory
-            wav_io = io.BytesIO()
-            with wave.open(wav_io, 'wb') as wav_file:
-                wav_file.setnchannels(1)
-                wav_file.setsampwidth(2)  # 16-bit
-                wav_file.setframerate(sample_rate)
-                
-                # Convert float to int16
-                audio_int16 = (audio_data * 32767).astype(np.int16)
-                wav_file.writeframes(audio_int16.tobytes())
-            
-            wav_io.seek(0)
+            # Convert numpy array to AudioData format via an in-memory WAV
+            wav_io = io.BytesIO(_wav_bytes(audio_data, int(sample_rate)))
             
             # Use speech recognition
             with sr.AudioFile(wav_io) as source:
@@ -196,12 +398,17 @@ class HybridVoiceVerification:
                 print("✗ Audio too short! Need at least 2 seconds")
                 return False
             
+            # Recognize enrollment phrase in the background
+            phrase_future = self._speech_executor.submit(
+                self.recognize_speech, audio_data, sample_rate
+            )
+            
             # 1. Extract voice fingerprint
-            fingerprint = self.extract_voice_fingerprint(audio_data, sample_rate)
+            fingerprint = self.get_voice_fingerprint(audio_data, sample_rate)
             print(f"✓ Voice fingerprint extracted: {len(fingerprint)} features")
             
             # 2. Recognize enrollment phrase
-            enrollment_phrase = self.recognize_speech(audio_data, sample_rate)
+            enrollment_phrase = phrase_future.result()
             
             if not enrollment_phrase:
                 print("⚠️  Could not recognize phrase - enrolling with voice only")
@@ -210,15 +417,23 @@ class HybridVoiceVerification:
                 print(f"✓ Enrollment phrase: \"{enrollment_phrase}\"")
             
             # 3. Save both
+            enrolled_data = {
+                'user_id': user_id,
+                'fingerprint': fingerprint,
+                'enrollment_phrase': enrollment_phrase,
+                'sample_rate': sample_rate,
+                'duration': duration
+            }
+            # Write to a temp file and swap it in so readers never see a partial pickle
             model_path = os.path.join(self.models_dir, f"speaker_{user_id}.pkl")
-            with open(model_path, 'wb') as f:
-                pickle.dump({
-                    'user_id': user_id,
-                    'fingerprint': fingerprint,
-                    'enrollment_phrase': enrollment_phrase,
-                    'sample_rate': sample_rate,
-                    'duration': duration
-                }, f)
+            tmp_path = model_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(enrolled_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, model_path)
+            
+            with self._enrolled_lock:
+                self._enrolled[str(user_id)] = enrolled_data
+                self._update_fingerprint_index()
             
             print(f"✓ User {user_id} enrolled successfully")
             print(f"  Voice fingerprint: {len(fingerprint)} features")
@@ -242,89 +457,133 @@ class HybridVoiceVerification:
             print(f"HYBRID VERIFICATION: User {user_id}")
             print(f"{'='*60}")
             
-            # Load enrolled data
-            model_path = os.path.join(self.models_dir, f"speaker_{user_id}.pkl")
-            if not os.path.exists(model_path):
+            # Look up enrolled data
+            enrolled_data = self._enrolled.get(str(user_id))
+            if enrolled_data is None:
                 print(f"✗ No enrollment found for user {user_id}")
                 return False, 0.0, "Not enrolled"
             
-            with open(model_path, 'rb') as f:
-                enrolled_data = pickle.load(f)
-            
-            enrolled_fingerprint = enrolled_data['fingerprint']
-            enrolled_phrase = enrolled_data.get('enrollment_phrase', '')
-            
-            # 1. Verify voice signature
-            test_fingerprint = self.extract_voice_fingerprint(audio_data, sample_rate)
-            
-            voice_distance = euclidean_distances(
-                enrolled_fingerprint.reshape(1, -1),
-                test_fingerprint.reshape(1, -1)
-            )[0][0]
-            
-            voice_confidence = max(0, min(100, 100 * (1 - voice_distance / 2.0)))
-            voice_match = voice_distance <= self.VOICE_DISTANCE_THRESHOLD
+            # Recognize spoken phrase in the background (only needed if one was enrolled)
+            phrase_future = None
+            if enrolled_data.get('enrollment_phrase', ''):
+                phrase_future = self._speech_executor.submit(
+                    self.recognize_speech, audio_data, sample_rate
+                )
             
-            print(f"Voice signature:")
-            print(f"  Distance: {voice_distance:.4f}")
-            print(f"  Confidence: {voice_confidence:.2f}%")
-            print(f"  Match: {'✓ YES' if voice_match else '✗ NO'}")
+            test_fingerprint = self.get_voice_fingerprint(audio_data, sample_rate)
+            test_phrase = phrase_future.result() if phrase_future is not None else None
             
-            # 2. Verify phrase (if enrolled with phrase)
-            phrase_match = True
-            phrase_similarity = 1.0
-            
-            if enrolled_phrase:  # Only check phrase if one was enrolled
-                test_phrase = self.recognize_speech(audio_data, sample_rate)
-                
-                if test_phrase:
-                    phrase_similarity = self.calculate_phrase_similarity(
-                        enrolled_phrase, test_phrase
-                    )
-                    phrase_match = phrase_similarity >= self.PHRASE_SIMILARITY_THRESHOLD
-                    
-                    print(f"Phrase verification:")
-                    print(f"  Enrolled: \"{enrolled_phrase}\"")
-                    print(f"  Spoken: \"{test_phrase}\"")
-                    print(f"  Similarity: {phrase_similarity*100:.2f}%")
-                    print(f"  Match: {'✓ YES' if phrase_match else '✗ NO'}")
-                else:
-                    print(f"Phrase verification:")
-                    print(f"  ✗ Could not recognize speech")
-                    phrase_match = False
-                    phrase_similarity = 0.0
-            else:
-                print(f"Phrase verification: SKIPPED (no phrase enrolled)")
-            
-            # 3. BOTH must match!
-            verified = voice_match and phrase_match
-            
-            # Combined confidence (average of both)
-            combined_confidence = (voice_confidence + phrase_similarity * 100) / 2
-            
-            print(f"\nFinal result:")
-            print(f"  Voice match: {'✓' if voice_match else '✗'}")
-            print(f"  Phrase match: {'✓' if phrase_match else '✗'}")
-            print(f"  Combined confidence: {combined_confidence:.2f}%")
-            print(f"  Result: {'✓ VERIFIED' if verified else '✗ REJECTED'}")
-            print(f"{'='*60}\n")
-            
-            reason = ""
-            if not voice_match:
-                reason = "Voice signature mismatch"
-            elif not phrase_match:
-                reason = "Phrase mismatch"
-            else:
-                reason = "Verified"
+            return self._verify_against(enrolled_data, test_fingerprint, test_phrase)
+        
+        except Exception as e:
+            print(f"✗ Verification failed: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return False, 0.0, str(e)
+    
+    def verify_from_embedding(self, user_id, fingerprint, phrase=None):
+        """
+        Verify a fingerprint the client already extracted, plus the phrase it recognized
+        (skips audio decoding, feature extraction and speech recognition)
+        """
+        try:
+            print(f"\n{'='*60}")
+            print(f"HYBRID VERIFICATION (embedding): User {user_id}")
+            print(f"{'='*60}")
             
-            return verified, combined_confidence, reason
+            enrolled_data = self._enrolled.get(str(user_id))
+            if enrolled_data is None:
+                print(f"✗ No enrollment found for user {user_id}")
+                return False, 0.0, "Not enrolled"
             
+            test_phrase = phrase.lower().strip() if phrase else None
+            return self._verify_against(
+                enrolled_data, self._normalize_fingerprint(fingerprint), test_phrase
+            )
+        
         except Exception as e:
             print(f"✗ Verification failed: {str(e)}")
             import traceback
             traceback.print_exc()
             return False, 0.0, str(e)
     
+    def _verify_against(self, enrolled_data, test_fingerprint, test_phrase):
+        """
+        Compare a test fingerprint and phrase with one enrolled speaker
+        
+        Returns:
+            (verified, combined_confidence, reason)
+        """
+        enrolled_fingerprint = enrolled_data['fingerprint']
+        enrolled_phrase = enrolled_data.get('enrollment_phrase', '')
+        
+        centering = self._fingerprint_index[3]
+        if centering is not None:
+            global_mean = centering[0]
+            enrolled_fingerprint = self._center_fingerprint(enrolled_fingerprint, global_mean)
+            test_fingerprint = self._center_fingerprint(test_fingerprint, global_mean)
+        
+        # 1. Verify voice signature
+        voice_distance = euclidean_distances(
+            enrolled_fingerprint.reshape(1, -1),
+            test_fingerprint.reshape(1, -1)
+        )[0][0]
+        
+        voice_confidence = max(0, min(100, 100 * (1 - voice_distance / 2.0)))
+        voice_match = voice_distance <= self.VOICE_DISTANCE_THRESHOLD
+        
+        print(f"Voice signature:")
+        print(f"  Distance: {voice_distance:.4f}")
+        print(f"  Confidence: {voice_confidence:.2f}%")
+        print(f"  Match: {'✓ YES' if voice_match else '✗ NO'}")
+        
+        # 2. Verify phrase (if enrolled with phrase)
+        phrase_match = True
+        phrase_similarity = 1.0
+        
+        if enrolled_phrase:  # Only check phrase if one was enrolled
+            if test_phrase:
+                phrase_similarity = self.calculate_phrase_similarity(
+                    enrolled_phrase, test_phrase
+                )
+                phrase_match = phrase_similarity >= self.PHRASE_SIMILARITY_THRESHOLD
+                
+                print(f"Phrase verification:")
+                print(f"  Enrolled: \"{enrolled_phrase}\"")
+                print(f"  Spoken: \"{test_phrase}\"")
+                print(f"  Similarity: {phrase_similarity*100:.2f}%")
+                print(f"  Match: {'✓ YES' if phrase_match else '✗ NO'}")
+            else:
+                print(f"Phrase verification:")
+                print(f"  ✗ Could not recognize speech")
+                phrase_match = False
+                phrase_similarity = 0.0
+        else:
+            print(f"Phrase verification: SKIPPED (no phrase enrolled)")
+        
+        # 3. BOTH must match!
+        verified = voice_match and phrase_match
+        
+        # Combined confidence (average of both)
+        combined_confidence = (voice_confidence + phrase_similarity * 100) / 2
+        
+        print(f"\nFinal result:")
+        print(f"  Voice match: {'✓' if voice_match else '✗'}")
+        print(f"  Phrase match: {'✓' if phrase_match else '✗'}")
+        print(f"  Combined confidence: {combined_confidence:.2f}%")
+        print(f"  Result: {'✓ VERIFIED' if verified else '✗ REJECTED'}")
+        print(f"{'='*60}\n")
+        
+        reason = ""
+        if not voice_match:
+            reason = "Voice signature mismatch"
+        elif not phrase_match:
+            reason = "Phrase mismatch"
+        else:
+            reason = "Verified"
+        
+        return verified, combined_confidence, reason
+    
     def identify_speaker(self, audio_data, sample_rate=16000):
         """
         Identify speaker using BOTH voice and phrase
@@ -334,100 +593,139 @@ class HybridVoiceVerification:
             print(f"HYBRID IDENTIFICATION")
             print(f"{'='*60}")
             
-            # Extract test features
-            test_fingerprint = self.extract_voice_fingerprint(audio_data, sample_rate)
-            test_phrase = self.recognize_speech(audio_data, sample_rate)
+            # Extract test features (speech recognition runs alongside the fingerprint)
+            phrase_future = self._speech_executor.submit(
+                self.recognize_speech, audio_data, sample_rate
+            )
+            test_fingerprint = self.get_voice_fingerprint(audio_data, sample_rate)
+            test_phrase = phrase_future.result()
             
-            if test_phrase:
-                print(f"Spoken phrase: \"{test_phrase}\"")
-            else:
-                print(f"Could not recognize phrase")
-            
-            # Compare with all enrolled users
-            best_match = None
-            best_score = -1
-            all_results = []
-            
-            for model_file in os.listdir(self.models_dir):
-                if model_file.endswith('.pkl'):
-                    user_id = model_file.replace('speaker_', '').replace('.pkl', '')
-                    
-                    model_path = os.path.join(self.models_dir, model_file)
-                    with open(model_path, 'rb') as f:
-                        enrolled_data = pickle.load(f)
-                    
-                    enrolled_fingerprint = enrolled_data['fingerprint']
-                    enrolled_phrase = enrolled_data.get('enrollment_phrase', '')
-                    
-                    # Calculate voice distance
-                    voice_distance = euclidean_distances(
-                        enrolled_fingerprint.reshape(1, -1),
-                        test_fingerprint.reshape(1, -1)
-                    )[0][0]
-                    
-                    voice_confidence = max(0, min(100, 100 * (1 - voice_distance / 2.0)))
-                    voice_match = voice_distance <= self.VOICE_DISTANCE_THRESHOLD
-                    
-                    # Calculate phrase similarity
-                    phrase_similarity = 1.0
-                    phrase_match = True
-                    
-                    if enrolled_phrase and test_phrase:
-                        phrase_similarity = self.calculate_phrase_similarity(
-                            enrolled_phrase, test_phrase
-                        )
-                        phrase_match = phrase_similarity >= self.PHRASE_SIMILARITY_THRESHOLD
-                    
-                    # Combined score
-                    combined_score = (voice_confidence + phrase_similarity * 100) / 2
-                    both_match = voice_match and phrase_match
-                    
-                    all_results.append((
-                        user_id, voice_distance, voice_match, 
-                        phrase_similarity, phrase_match, 
-                        combined_score, both_match
-                    ))
-                    
-                    print(f"User {user_id}:")
-                    print(f"  Voice: dist={voice_distance:.4f}, match={'✓' if voice_match else '✗'}")
-                    if enrolled_phrase:
-                        print(f"  Phrase: sim={phrase_similarity:.2f}, match={'✓' if phrase_match else '✗'}")
-                    print(f"  Combined: {combined_score:.2f}%, both_match={'✓' if both_match else '✗'}")
-                    
-                    if both_match and combined_score > best_score:
-                        best_score = combined_score
-                        best_match = user_id
-            
-            # Sort by combined score
-            all_results.sort(key=lambda x: x[5], reverse=True)
-            
-            print(f"\nRanked results:")
-            for i, (uid, vd, vm, ps, pm, cs, bm) in enumerate(all_results[:3], 1):
-                print(f"  {i}. User {uid}: score={cs:.2f}%, both_match={'✓' if bm else '✗'}")
-            
-            if best_match:
-                print(f"\n✓ IDENTIFIED: User {best_match}")
-                print(f"  Combined confidence: {best_score:.2f}%")
-                print(f"{'='*60}\n")
-                return best_match, best_score
-            else:
-                print(f"\n✗ NO MATCH FOUND")
-                print(f"  No user matched both voice AND phrase")
-                print(f"{'='*60}\n")
-                return None, 0.0
-                
+            return self._identify_against(test_fingerprint, test_phrase)
+        
         except Exception as e:
             print(f"✗ Identification failed: {str(e)}")
             import traceback
             traceback.print_exc()
             return None, 0.0
     
+    def identify_from_embedding(self, fingerprint, phrase=None):
+        """
+        Identify speaker from a fingerprint the client already extracted,
+        plus the phrase it recognized
+        """
+        try:
+            print(f"\n{'='*60}")
+            print(f"HYBRID IDENTIFICATION (embedding)")
+            print(f"{'='*60}")
+            
+            test_phrase = phrase.lower().strip() if phrase else None
+            return self._identify_against(self._normalize_fingerprint(fingerprint), test_phrase)
+        
+        except Exception as e:
+            print(f"✗ Identification failed: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return None, 0.0
+    
+    def _identify_against(self, test_fingerprint, test_phrase):
+        """
+        Rank every enrolled speaker against a test fingerprint and phrase
+        
+        Returns:
+            (user_id, confidence) or (None, 0.0) if nobody matched both
+        """
+        if test_phrase:
+            print(f"Spoken phrase: \"{test_phrase}\"")
+        else:
+            print(f"Could not recognize phrase")
+        
+        # Compare with all enrolled users
+        best_match = None
+        best_score = -1
+        all_results = []
+        
+        # Voice distance to every enrolled user in one matrix-vector product
+        # (for unit vectors, |a - b| = sqrt(2 - 2 a.b))
+        user_ids, fingerprint_matrix, enrolled_phrases, centering = self._fingerprint_index
+        if centering is not None:
+            global_mean, fingerprint_matrix = centering
+            test_fingerprint = self._center_fingerprint(test_fingerprint, global_mean)
+        if user_ids:
+            similarities = fingerprint_matrix @ test_fingerprint.astype(np.float32)
+            voice_distances = np.sqrt(np.maximum(0.0, 2.0 - 2.0 * similarities))
+        
+        for i, user_id in enumerate(user_ids):
+            enrolled_phrase = enrolled_phrases[i]
+            voice_distance = float(voice_distances[i])
+            
+            voice_confidence = max(0, min(100, 100 * (1 - voice_distance / 2.0)))
+            voice_match = voice_distance <= self.VOICE_DISTANCE_THRESHOLD
+            
+            # Calculate phrase similarity
+            phrase_similarity = 1.0
+            phrase_match = True
+            
+            if enrolled_phrase and test_phrase:
+                phrase_similarity = self.calculate_phrase_similarity(
+                    enrolled_phrase, test_phrase
+                )
+                phrase_match = phrase_similarity >= self.PHRASE_SIMILARITY_THRESHOLD
+            
+            # Combined score
+            combined_score = (voice_confidence + phrase_similarity * 100) / 2
+            both_match = voice_match and phrase_match
+            
+            all_results.append((
+                user_id, voice_distance, voice_match,
+                phrase_similarity, phrase_match,
+                combined_score, both_match
+            ))
+            
+            print(f"User {user_id}:")
+            print(f"  Voice: dist={voice_distance:.4f}, match={'✓' if voice_match else '✗'}")
+            if enrolled_phrase:
+                print(f"  Phrase: sim={phrase_similarity:.2f}, match={'✓' if phrase_match else '✗'}")
+            print(f"  Combined: {combined_score:.2f}%, both_match={'✓' if both_match else '✗'}")
+            
+            if both_match and combined_score > best_score:
+                best_score = combined_score
+                best_match = user_id
+        
+        # Sort by combined score
+        all_results.sort(key=lambda x: x[5], reverse=True)
+        
+        print(f"\nRanked results:")
+        for i, (uid, vd, vm, ps, pm, cs, bm) in enumerate(all_results[:3], 1):
+            print(f"  {i}. User {uid}: score={cs:.2f}%, both_match={'✓' if bm else '✗'}")
+        
+        if best_match:
+            print(f"\n✓ IDENTIFIED: User {best_match}")
+            print(f"  Combined confidence: {best_score:.2f}%")
+            print(f"{'='*60}\n")
+            return best_match, best_score
+        else:
+            print(f"\n✗ NO MATCH FOUND")
+            print(f"  No user matched both voice AND phrase")
+            print(f"{'='*60}\n")
+            return None, 0.0
+    
+    def is_enrolled(self, user_id):
+        """Check whether user_id is enrolled (no disk access)"""
+        return str(user_id) in self._enrolled
+    
     def delete_speaker(self, user_id):
         """Delete speaker enrollment"""
         try:
             model_path = os.path.join(self.models_dir, f"speaker_{user_id}.pkl")
-            if os.path.exists(model_path):
-                os.remove(model_path)
+            with self._enrolled_lock:
+                deleted = os.path.exists(model_path)
+                if deleted:
+                    os.remove(model_path)
+                removed = self._enrolled.pop(str(user_id), None) is not None
+                if deleted or removed:
+                    self._update_fingerprint_index()
+            
+            if deleted:
                 print(f"✓ Speaker {user_id} deleted")
                 return True
             return False
@@ -22,9 +22,9 @@ echo Installing core dependencies...
 echo This may take a few minutes...
 echo.
 
-REM Install Flask and CORS
+REM Install Flask, CORS and response compression
 echo [1/10] Installing Flask...
-pip install flask flask-cors
+pip install flask flask-cors flask-compress flask-orjson waitress
 
 REM Install Speech Recognition
 echo [2/10] Installing SpeechRecognition...
@@ -65,7 +65,7 @@ pip install soundfile
 
 REM Install Utilities
 echo [10/10] Installing Utilities...
-pip install joblib python_speech_features
+pip install joblib python_speech_features pybase64 soxr numba
 
 echo.
 echo ========================================
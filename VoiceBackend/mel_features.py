@@ -0,0 +1,48 @@
+"""
+Shared Mel filterbank for the verifiers' MFCC / Mel spectrogram features
+The filterbank is built once at import instead of on every librosa call
+"""
+
+import numpy as np
+import librosa
+
+# librosa defaults, so features match librosa.feature.mfcc / melspectrogram
+SAMPLE_RATE = 16000
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128
+
+MEL_FB = librosa.filters.mel(sr=SAMPLE_RATE, n_fft=N_FFT, n_mels=N_MELS)
+
+
+def melspectrogram(audio_data, sample_rate=SAMPLE_RATE, mel_fb=MEL_FB):
+    """
+    Mel power spectrogram using the precomputed filterbank
+
+    Args:
+        audio_data: Mono audio samples
+        sample_rate: Sample rate (other rates build a filterbank per call)
+        mel_fb: Mel filterbank for SAMPLE_RATE
+
+    Returns:
+        Mel spectrogram, shape (N_MELS, frames)
+    """
+    if sample_rate != SAMPLE_RATE:
+        return librosa.feature.melspectrogram(
+            y=audio_data, sr=sample_rate, n_fft=N_FFT,
+            hop_length=HOP_LENGTH, n_mels=N_MELS
+        )
+
+    power_spec = np.abs(librosa.stft(audio_data, n_fft=N_FFT, hop_length=HOP_LENGTH)) ** 2
+    return mel_fb @ power_spec
+
+
+def mfcc(audio_data, sample_rate=SAMPLE_RATE, n_mfcc=20, mel_fb=MEL_FB):
+    """
+    MFCCs using the precomputed filterbank (same result as librosa.feature.mfcc)
+
+    Returns:
+        MFCCs, shape (n_mfcc, frames)
+    """
+    mel_spec = melspectrogram(audio_data, sample_rate, mel_fb)
+    return librosa.feature.mfcc(S=librosa.power_to_db(mel_spec), n_mfcc=n_mfcc)
@@ -6,11 +6,13 @@ Designed to work with real microphone recordings
 
 import numpy as np
 import librosa
-from sklearn.preprocessing import StandardScaler
+from sklearn.preprocessing import StandardScaler, normalize
 from sklearn.metrics.pairwise import euclidean_distances
+from scipy.signal import find_peaks
 import pickle
 import os
 import hashlib
+import mel_features
 
 class RobustSpeakerVerification:
     """
@@ -22,6 +24,13 @@ class RobustSpeakerVerification:
         self.models_dir = models_dir
         os.makedirs(models_dir, exist_ok=True)
         
+        # IDs with a saved model, kept in sync on enroll/delete so unknown
+        # users can be rejected before any audio is decoded
+        self._enrolled_ids = {
+            f[len('speaker_'):-len('.pkl')] for f in os.listdir(models_dir)
+            if f.startswith('speaker_') and f.endswith('.pkl')
+        }
+        
         # STRICT threshold for normalized features
         # Lower = more strict (fewer false accepts, more false rejects)
         # Higher = more relaxed (more false accepts, fewer false rejects)
@@ -73,8 +82,6 @@ class RobustSpeakerVerification:
             
             # 2. Formant frequencies (vocal tract shape)
             # Use LPC to estimate formants
-            from scipy.signal import lfilter
-            
             # Pre-emphasis
             pre_emphasis = 0.97
             emphasized = np.append(audio_data[0], audio_data[1:] - pre_emphasis * audio_data[:-1])
@@ -97,7 +104,6 @@ class RobustSpeakerVerification:
                 freqs = np.fft.rfftfreq(len(mid_frame), 1/sample_rate)
                 
                 # Find peaks (formants)
-                from scipy.signal import find_peaks
                 peaks, _ = find_peaks(magnitude, height=np.max(magnitude)*0.1, distance=20)
                 
                 formant_freqs = freqs[peaks][:4]  # First 4 formants
@@ -127,7 +133,7 @@ class RobustSpeakerVerification:
             ])
             
             # 4. MFCC (voice timbre)
-            mfccs = librosa.feature.mfcc(y=audio_data, sr=sample_rate, n_mfcc=20)
+            mfccs = mel_features.mfcc(audio_data, sample_rate, n_mfcc=20)
             
             features.extend([
                 np.mean(mfccs, axis=1).tolist(),
@@ -152,7 +158,6 @@ class RobustSpeakerVerification:
             
             # NORMALIZE the fingerprint (CRITICAL!)
             # This ensures all features are on the same scale
-            from sklearn.preprocessing import normalize
             fingerprint = normalize(fingerprint.reshape(1, -1))[0]
             
             print(f"✓ Extracted voice fingerprint: {len(fingerprint)} features (normalized)")
@@ -195,6 +200,7 @@ class RobustSpeakerVerification:
                     'sample_rate': sample_rate,
                     'duration': duration
                 }, f)
+            self._enrolled_ids.add(str(user_id))
             
             print(f"✓ Speaker {user_id} enrolled successfully")
             print(f"  Fingerprint size: {len(fingerprint)} features")
@@ -332,12 +338,17 @@ class RobustSpeakerVerification:
             traceback.print_exc()
             return None, 0.0
     
+    def is_enrolled(self, user_id):
+        """Check whether user_id has a saved model (no disk access)"""
+        return str(user_id) in self._enrolled_ids
+    
     def delete_speaker(self, user_id):
         """Delete speaker enrollment"""
         try:
             model_path = os.path.join(self.models_dir, f"speaker_{user_id}.pkl")
             if os.path.exists(model_path):
                 os.remove(model_path)
+                self._enrolled_ids.discard(str(user_id))
                 print(f"✓ Speaker {user_id} deleted")
                 return True
             return False
@@ -8,11 +8,12 @@ import numpy as np
 import librosa
 import soundfile as sf
 from sklearn.preprocessing import normalize
-from sklearn.metrics.pairwise import cosine_similarity
+from fast_cosine import cosine_similarity
 import pickle
 import os
 from scipy.signal import wiener
 from python_speech_features import mfcc, delta
+import mel_features
 
 class SpeakerVerificationSystem:
     """
@@ -26,6 +27,13 @@ class SpeakerVerificationSystem:
         self.models_dir = models_dir
         os.makedirs(models_dir, exist_ok=True)
         
+        # IDs with a saved model, kept in sync on enroll/delete so unknown
+        # users can be rejected before any audio is decoded
+        self._enrolled_ids = {
+            f[len('speaker_'):-len('.pkl')] for f in os.listdir(models_dir)
+            if f.startswith('speaker_') and f.endswith('.pkl')
+        }
+        
         # Verification thresholds (MUCH STRICTER - based on observed similarities)
         self.STRICT_THRESHOLD = 0.985  # Very strict - must be 98.5%+ match
         self.NORMAL_THRESHOLD = 0.980  # Normal security - 98%+ match
@@ -128,8 +136,7 @@ class SpeakerVerificationSystem:
             ])
             
             # 6. Mel spectrogram features
-            mel_spec = librosa.feature.melspectrogram(
-                y=audio_data, sr=sample_rate, n_mels=128)
+            mel_spec = mel_features.melspectrogram(audio_data, sample_rate)
             mel_spec_db = librosa.power_to_db(mel_spec, ref=np.max)
             
             features.extend([
@@ -193,6 +200,7 @@ class SpeakerVerificationSystem:
                     'sample_rate': sample_rate,
                     'duration': duration
                 }, f)
+            self._enrolled_ids.add(str(user_id))
             
             print(f"✓ Speaker {user_id} enrolled successfully")
             print(f"  Embedding saved: {model_path}")
@@ -242,10 +250,7 @@ class SpeakerVerificationSystem:
             test_embedding = self.extract_speaker_embedding(audio_data, sample_rate)
             
             # Calculate cosine similarity
-            similarity = cosine_similarity(
-                enrolled_embedding.reshape(1, -1),
-                test_embedding.reshape(1, -1)
-            )[0][0]
+            similarity = cosine_similarity(enrolled_embedding, test_embedding)
             
             # Convert to percentage
             confidence = similarity * 100
@@ -303,10 +308,7 @@ class SpeakerVerificationSystem:
                     enrolled_embedding = enrolled_data['embedding']
                     
                     # Calculate similarity
-                    similarity = cosine_similarity(
-                        enrolled_embedding.reshape(1, -1),
-                        test_embedding.reshape(1, -1)
-                    )[0][0]
+                    similarity = cosine_similarity(enrolled_embedding, test_embedding)
                     
                     print(f"User {user_id}: similarity = {similarity:.4f}")
                     
@@ -331,12 +333,17 @@ class SpeakerVerificationSystem:
             print(f"✗ Identification failed: {str(e)}")
             return None, 0.0
     
+    def is_enrolled(self, user_id):
+        """Check whether user_id has a saved model (no disk access)"""
+        return str(user_id) in self._enrolled_ids
+    
     def delete_speaker(self, user_id):
         """Delete a speaker's enrollment"""
         try:
             model_path = os.path.join(self.models_dir, f"speaker_{user_id}.pkl")
             if os.path.exists(model_path):
                 os.remove(model_path)
+                self._enrolled_ids.discard(str(user_id))
                 print(f"✓ Speaker {user_id} deleted")
                 return True
             else:
@@ -362,12 +369,15 @@ if __name__ == "__main__":
     
     system = SpeakerVerificationSystem()
     
+    # Seeded generator so test runs are reproducible
+    rng = np.random.default_rng(0xC0FFEE)
+    
     # Generate test audio
     def generate_test_audio(duration=3.0, freq=200):
         sample_rate = 16000
-        t = np.linspace(0, duration, int(sample_rate * duration))
+        t = np.linspace(0, duration, int(sample_rate * duration), dtype=np.float32)
         audio = 0.3 * np.sin(2 * np.pi * freq * t)
-        audio += 0.1 * np.random.randn(len(audio))
+        audio += 0.1 * rng.standard_normal(len(audio), dtype=np.float32)
         return audio, sample_rate
     
     # Test enrollment
@@ -4,23 +4,70 @@ Flask-based REST API - Works with pre-recorded audio only
 Provides voice authentication services only
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-import base64
+from werkzeug.serving import WSGIRequestHandler
+from werkzeug.exceptions import HTTPException
+import json
+import hashlib
+import operator
 import numpy as np
 import io
+import struct
+from math import gcd
 import soundfile as sf
+from scipy.signal import resample_poly
 from voice_authentication import VoiceAuthenticator
 from speaker_verification import SpeakerVerificationSystem
 from robust_speaker_verification import RobustSpeakerVerification
 from hybrid_voice_verification import HybridVoiceVerification
 import os
 
+# SIMD base64 decoder for the audio payload; same API as the stdlib module
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+# SIMD resampler; falls back to scipy's polyphase filter
+try:
+    import soxr
+except ImportError:
+    soxr = None
+
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
+try:
+    from flask_orjson import OrjsonProvider
+except ImportError:
+    OrjsonProvider = None
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for C# client
 
+# Use orjson for request parsing and jsonify when available
+if OrjsonProvider is not None:
+    app.json = OrjsonProvider(app)
+
+# gzip JSON responses larger than 1 KB when the client sends Accept-Encoding: gzip
+app.config['COMPRESS_MIMETYPES'] = ['application/json']
+app.config['COMPRESS_MIN_SIZE'] = 1024
+app.config['COMPRESS_LEVEL'] = 5
+if Compress is not None:
+    Compress(app)
+
+# Reject oversized uploads before they are buffered (30s stereo 48 kHz WAV fits easily)
+app.config['MAX_CONTENT_LENGTH'] = 32 * 1024 * 1024
+
+# All uploads are resampled once to this rate before reaching a verifier
+TARGET_SAMPLE_RATE = 16000
+
 # Initialize voice authenticator (old GMM-based)
 authenticator = VoiceAuthenticator(models_dir="voice_models")
+authenticator.build_identification_matrix()
 
 # Initialize advanced speaker verification
 speaker_verifier = SpeakerVerificationSystem(models_dir="voice_models_embeddings")
@@ -36,28 +83,206 @@ USE_HYBRID_VERIFICATION = True
 USE_ROBUST_VERIFICATION = False
 USE_ADVANCED_VERIFICATION = False
 
+# Serve with waitress (multi-threaded production WSGI server) instead of the
+# Flask dev server. Enable with VOICE_API_PRODUCTION=1
+USE_PRODUCTION_SERVER = os.environ.get('VOICE_API_PRODUCTION', '0') == '1'
+
+# /auth/*_embedding endpoints trust a fingerprint and phrase computed by the
+# client, so a leaked fingerprint is enough to pass. Off unless the clients are
+# trusted: VOICE_API_CLIENT_EMBEDDINGS=1
+ALLOW_CLIENT_EMBEDDINGS = os.environ.get('VOICE_API_CLIENT_EMBEDDINGS', '0') == '1'
+
+# Flask debug mode (interactive tracebacks) for the development server: FLASK_DEBUG=1
+DEBUG_MODE = os.environ.get('FLASK_DEBUG', '0') == '1'
+PRODUCTION_THREADS = int(os.environ.get('VOICE_API_THREADS', '8'))
+
+# Pulls (user_id, audio_data) out of a parsed request body in one call
+_get_user_audio = operator.itemgetter('user_id', 'audio_data')
+
+# Cached model file counts per models directory: {path: (mtime_ns, count)}
+_model_count_cache = {}
+
+# Prebuilt /system/info (models_dirs_state, body, etag), rebuilt whenever a
+# models directory changes on disk (API enroll/delete or files added by hand)
+_system_info_cache = None
+
+
+def _count_models(path):
+    """Count model files (.pkl, or .npz for GMMs) in a directory, cached on the directory mtime"""
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+    
+    cached = _model_count_cache.get(path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+    
+    with os.scandir(path) as entries:
+        count = sum(1 for entry in entries if entry.name.endswith(('.pkl', '.npz')))
+    
+    _model_count_cache[path] = (mtime_ns, count)
+    return count
+
+
+def read_pcm16_wav(audio_bytes):
+    """
+    Fast path for 16-bit mono PCM WAV (what the C# client sends)
+    Walks the RIFF chunks directly and views the samples with np.frombuffer
+    instead of going through libsndfile
+    
+    Returns:
+        (audio_data, sample_rate), or None if the file is not a 16-bit
+        mono PCM WAV
+    """
+    if len(audio_bytes) < 12 or audio_bytes[:4] != b'RIFF' or audio_bytes[8:12] != b'WAVE':
+        return None
+    
+    sample_rate = None
+    offset = 12
+    while offset + 8 <= len(audio_bytes):
+        chunk_id = audio_bytes[offset:offset + 4]
+        chunk_size = struct.unpack('<I', audio_bytes[offset + 4:offset + 8])[0]
+        offset += 8
+        
+        if chunk_id == b'fmt ':
+            if chunk_size < 16:
+                return None
+            audio_format, channels, sample_rate = struct.unpack('<HHI', audio_bytes[offset:offset + 8])
+            bits_per_sample = struct.unpack('<H', audio_bytes[offset + 14:offset + 16])[0]
+            if audio_format != 1 or channels != 1 or bits_per_sample != 16:
+                return None
+        elif chunk_id == b'data':
+            if sample_rate is None:
+                return None
+            n_samples = min(chunk_size, len(audio_bytes) - offset) // 2
+            audio_data = np.frombuffer(audio_bytes, dtype='<i2', count=n_samples, offset=offset)
+            return audio_data * np.float32(1.0 / 32768.0), sample_rate
+        
+        # Chunks are word-aligned
+        offset += chunk_size + (chunk_size & 1)
+    
+    return None
+
+
+def resample_to_target(audio_data, sample_rate):
+    """
+    Resample audio to TARGET_SAMPLE_RATE (no-op if already there)
+    Done once here so the verifiers never have to resample themselves
+    """
+    if sample_rate == TARGET_SAMPLE_RATE:
+        return audio_data, sample_rate
+    
+    if soxr is not None:
+        audio_data = soxr.resample(audio_data, sample_rate, TARGET_SAMPLE_RATE)
+    else:
+        divisor = gcd(int(sample_rate), TARGET_SAMPLE_RATE)
+        audio_data = resample_poly(audio_data, TARGET_SAMPLE_RATE // divisor,
+                                   int(sample_rate) // divisor, axis=0)
+    return audio_data, TARGET_SAMPLE_RATE
+
+
+def read_audio_bytes(audio_bytes):
+    """Read encoded audio file bytes (WAV, FLAC, ...) to numpy array at TARGET_SAMPLE_RATE"""
+    try:
+        decoded = read_pcm16_wav(audio_bytes)
+        if decoded is None:
+            # Non-standard WAV or other formats - let libsndfile handle it
+            # (float32 like the fast path; half the bytes of the float64 default)
+            audio_data, sample_rate = sf.read(io.BytesIO(audio_bytes), dtype='float32',
+                                              always_2d=False)
+            if audio_data.ndim == 2:
+                # Downmix before resampling so only one channel is resampled
+                audio_data = audio_data.mean(axis=1, dtype=np.float32)
+            decoded = audio_data, sample_rate
+        
+        return resample_to_target(*decoded)
+    except Exception as e:
+        raise ValueError(f"Failed to decode audio: {str(e)}")
+
 
 def decode_audio(audio_base64):
     """Decode base64 audio data to numpy array"""
     try:
         audio_bytes = base64.b64decode(audio_base64)
-        audio_data, sample_rate = sf.read(io.BytesIO(audio_bytes))
-        return audio_data, sample_rate
     except Exception as e:
         raise ValueError(f"Failed to decode audio: {str(e)}")
+    return read_audio_bytes(audio_bytes)
+
+
+def decode_embedding(embedding_base64):
+    """
+    Decode a base64 voice fingerprint (little-endian float32) sent by the client
+    
+    Returns:
+        (fingerprint, error) - error is a message for a 400 response, or None
+    """
+    try:
+        fingerprint = np.frombuffer(base64.b64decode(embedding_base64), dtype='<f4')
+    except Exception as e:
+        return None, f"Failed to decode embedding: {str(e)}"
+    
+    expected_dim = hybrid_verifier.fingerprint_dim
+    if expected_dim is not None and fingerprint.shape[0] != expected_dim:
+        return None, f"Embedding must have {expected_dim} values, got {fingerprint.shape[0]}"
+    if not np.all(np.isfinite(fingerprint)):
+        return None, "Embedding contains non-finite values"
+    return fingerprint, None
+
+
+def read_audio_stream():
+    """
+    Read a raw audio upload from the request body
+    Used for application/octet-stream requests, which skip the JSON and
+    base64 copies of the audio. The body is still held in memory once,
+    up to MAX_CONTENT_LENGTH (larger uploads raise RequestEntityTooLarge)
+    """
+    return request.get_data(cache=False)
+
+
+def is_stream_upload():
+    """True if the request carries raw audio in the body instead of JSON"""
+    return request.mimetype == 'application/octet-stream'
+
+
+def is_enrolled_for_verify(user_id):
+    """Check enrollment in the same backend /auth/verify scores against"""
+    if USE_ROBUST_VERIFICATION:
+        return robust_verifier.is_enrolled(user_id)
+    if USE_ADVANCED_VERIFICATION:
+        return speaker_verifier.is_enrolled(user_id)
+    return authenticator.is_enrolled(user_id)
+
+
+def unknown_user_response(user_id):
+    """404 for a user_id with no enrollment, sent before any audio is decoded"""
+    return jsonify({
+        'verified': False,
+        'confidence': 0.0,
+        'user_id': user_id,
+        'reason': 'unknown_user'
+    }), 404
+
+
+# Health response never changes, so serialize it once
+HEALTH_JSON = json.dumps({
+    'status': 'healthy',
+    'services': {
+        'authentication': 'running',
+        'command_recognition': 'limited (no microphone)'
+    },
+    'note': 'This is the no-microphone version. Audio must be sent via API.'
+}).encode('utf-8')
+
+# Let load balancers / proxies reuse a health answer for a few seconds
+HEALTH_HEADERS = {'Cache-Control': 'max-age=5'}
 
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
-        'services': {
-            'authentication': 'running',
-            'command_recognition': 'limited (no microphone)'
-        },
-        'note': 'This is the no-microphone version. Audio must be sent via API.'
-    })
+    # A fresh Response per request: after_request hooks (CORS, compression) mutate it
+    return Response(HEALTH_JSON, mimetype='application/json', headers=HEALTH_HEADERS)
 
 
 # ==================== AUTHENTICATION ENDPOINTS ====================
@@ -66,15 +291,27 @@ def health_check():
 def enroll_user():
     """Enroll a new user for voice authentication using advanced speaker verification"""
     try:
-        data = request.json
-        user_id = data.get('user_id')
-        audio_base64 = data.get('audio_data')
-        
-        if not user_id or not audio_base64:
-            return jsonify({'error': 'Missing user_id or audio_data'}), 400
-        
-        # Decode audio
-        audio_data, sample_rate = decode_audio(audio_base64)
+        if is_stream_upload():
+            # Raw audio body, user_id passed as query parameter
+            user_id = request.args.get('user_id')
+            audio_bytes = read_audio_stream()
+            
+            if not user_id or not audio_bytes:
+                return jsonify({'error': 'Missing user_id or audio_data'}), 400
+            
+            audio_data, sample_rate = read_audio_bytes(audio_bytes)
+        else:
+            data = request.get_json(cache=True)
+            try:
+                user_id, audio_base64 = _get_user_audio(data)
+            except KeyError:
+                return jsonify({'error': 'Missing user_id or audio_data'}), 400
+            
+            if not user_id or not audio_base64:
+                return jsonify({'error': 'Missing user_id or audio_data'}), 400
+            
+            # Decode audio
+            audio_data, sample_rate = decode_audio(audio_base64)
         
         # Use HYBRID verification (voice + phrase) - most secure!
         if USE_HYBRID_VERIFICATION:
@@ -114,6 +351,8 @@ def enroll_user():
                 'message': 'Enrollment failed'
             }), 500
             
+    except HTTPException:
+        raise  # 413 for oversized uploads, 400 for malformed JSON
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -122,16 +361,33 @@ def enroll_user():
 def verify_user():
     """Verify user identity through voice using advanced speaker verification"""
     try:
-        data = request.json
-        user_id = data.get('user_id')
-        audio_base64 = data.get('audio_data')
-        threshold = data.get('threshold', 0.80)  # Default to strict threshold
-        
-        if not user_id or not audio_base64:
-            return jsonify({'error': 'Missing user_id or audio_data'}), 400
-        
-        # Decode audio
-        audio_data, sample_rate = decode_audio(audio_base64)
+        if is_stream_upload():
+            # Raw audio body, user_id/threshold passed as query parameters
+            user_id = request.args.get('user_id')
+            threshold = request.args.get('threshold', 0.80, type=float)
+            if user_id and not is_enrolled_for_verify(user_id):
+                return unknown_user_response(user_id)
+            audio_bytes = read_audio_stream()
+            
+            if not user_id or not audio_bytes:
+                return jsonify({'error': 'Missing user_id or audio_data'}), 400
+            
+            audio_data, sample_rate = read_audio_bytes(audio_bytes)
+        else:
+            data = request.get_json(cache=True)
+            try:
+                user_id, audio_base64 = _get_user_audio(data)
+            except KeyError:
+                return jsonify({'error': 'Missing user_id or audio_data'}), 400
+            threshold = data.get('threshold', 0.80)  # Default to strict threshold
+            
+            if not user_id or not audio_base64:
+                return jsonify({'error': 'Missing user_id or audio_data'}), 400
+            if not is_enrolled_for_verify(user_id):
+                return unknown_user_response(user_id)
+            
+            # Decode audio
+            audio_data, sample_rate = decode_audio(audio_base64)
         
         # Use ROBUST speaker verification (best!)
         if USE_ROBUST_VERIFICATION:
@@ -164,6 +420,8 @@ def verify_user():
             'method': 'advanced_speaker_verification' if USE_ADVANCED_VERIFICATION else 'gmm'
         })
         
+    except HTTPException:
+        raise  # 413 for oversized uploads, 400 for malformed JSON
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -172,7 +430,7 @@ def verify_user():
 def identify_user():
     """Identify which user is speaking using advanced speaker verification"""
     try:
-        data = request.json
+        data = request.get_json(cache=True)
         audio_base64 = data.get('audio_data')
         threshold = data.get('threshold', 0.80)  # Default to strict threshold
         
@@ -227,6 +485,102 @@ def identify_user():
                 'message': 'No matching user found'
             })
         
+    except HTTPException:
+        raise  # 413 for oversized uploads, 400 for malformed JSON
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/auth/verify_embedding', methods=['POST'])
+def verify_user_embedding():
+    """
+    Verify a user from a voice fingerprint the client already computed
+    Skips audio upload, decoding and feature extraction; 'phrase' is the
+    text the client recognized, checked against the enrolled phrase.
+    Only a success carries a confidence, so failed attempts can't be used
+    to tune a forged fingerprint
+    """
+    try:
+        if not ALLOW_CLIENT_EMBEDDINGS:
+            return jsonify({'error': 'Not found'}), 404
+        if not USE_HYBRID_VERIFICATION:
+            return jsonify({'error': 'Embedding verification requires hybrid verification'}), 400
+        
+        data = request.get_json(cache=True)
+        user_id = data.get('user_id')
+        embedding_base64 = data.get('embedding')
+        
+        if not user_id or not embedding_base64:
+            return jsonify({'error': 'Missing user_id or embedding'}), 400
+        
+        fingerprint, error = decode_embedding(embedding_base64)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        is_verified, confidence, reason = hybrid_verifier.verify_from_embedding(
+            user_id=user_id,
+            fingerprint=fingerprint,
+            phrase=data.get('phrase')
+        )
+        
+        if not is_verified:
+            return jsonify({'verified': False})
+        
+        return jsonify({
+            'verified': True,
+            'confidence': float(confidence),
+            'user_id': user_id,
+            'reason': reason,
+            'method': 'hybrid_embedding'
+        })
+        
+    except HTTPException:
+        raise  # 413 for oversized uploads, 400 for malformed JSON
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/auth/identify_embedding', methods=['POST'])
+def identify_user_embedding():
+    """Identify which user is speaking from a client-computed voice fingerprint"""
+    try:
+        if not ALLOW_CLIENT_EMBEDDINGS:
+            return jsonify({'error': 'Not found'}), 404
+        if not USE_HYBRID_VERIFICATION:
+            return jsonify({'error': 'Embedding identification requires hybrid verification'}), 400
+        
+        data = request.get_json(cache=True)
+        embedding_base64 = data.get('embedding')
+        
+        if not embedding_base64:
+            return jsonify({'error': 'Missing embedding'}), 400
+        
+        fingerprint, error = decode_embedding(embedding_base64)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        user_id, confidence = hybrid_verifier.identify_from_embedding(
+            fingerprint=fingerprint,
+            phrase=data.get('phrase')
+        )
+        
+        if user_id:
+            return jsonify({
+                'success': True,
+                'identified': True,
+                'user_id': str(user_id),
+                'confidence': float(confidence),
+                'method': 'hybrid_embedding'
+            })
+        else:
+            return jsonify({
+                'success': False,
+                'identified': False,
+                'user_id': None
+            })
+        
+    except HTTPException:
+        raise  # 413 for oversized uploads, 400 for malformed JSON
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -235,13 +589,14 @@ def identify_user():
 def delete_user(user_id):
     """Delete user's voice model from both systems"""
     try:
-        # Delete from all systems
-        success1 = hybrid_verifier.delete_speaker(user_id) if USE_HYBRID_VERIFICATION else True
-        success2 = robust_verifier.delete_speaker(user_id) if USE_ROBUST_VERIFICATION else True
-        success3 = speaker_verifier.delete_speaker(user_id) if USE_ADVANCED_VERIFICATION else True
-        success4 = authenticator.delete_user(user_id)
-        
-        success = success1 or success2 or success3 or success4
+        # Delete from every backend in use; the GMM model is only touched
+        # when its in-memory index says this user has one
+        success = any([
+            USE_HYBRID_VERIFICATION and hybrid_verifier.delete_speaker(user_id),
+            USE_ROBUST_VERIFICATION and robust_verifier.delete_speaker(user_id),
+            USE_ADVANCED_VERIFICATION and speaker_verifier.delete_speaker(user_id),
+            authenticator.is_enrolled(user_id) and authenticator.delete_user(user_id)
+        ])
         
         return jsonify({
             'success': success,
@@ -254,29 +609,72 @@ def delete_user(user_id):
 
 # ==================== SYSTEM ENDPOINTS ====================
 
+def active_models_dirs():
+    """Model directories of the backends the endpoints currently use"""
+    models_dirs = []
+    if USE_HYBRID_VERIFICATION:
+        models_dirs.append(hybrid_verifier.models_dir)
+    if USE_ROBUST_VERIFICATION:
+        models_dirs.append(robust_verifier.models_dir)
+    if USE_ADVANCED_VERIFICATION:
+        models_dirs.append(speaker_verifier.models_dir)
+    if not (USE_ROBUST_VERIFICATION or USE_ADVANCED_VERIFICATION):
+        # /auth/verify falls back to the GMM models
+        models_dirs.append(authenticator.models_dir)
+    return models_dirs
+
+
+def models_dirs_state():
+    """(models_dir, mtime_ns) of every active models directory - the /system/info cache key"""
+    state = []
+    for models_dir in active_models_dirs():
+        try:
+            mtime_ns = os.stat(models_dir).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        state.append((models_dir, mtime_ns))
+    return tuple(state)
+
+
+def build_system_info():
+    """Serialize the /system/info body and its ETag"""
+    # Count enrolled users in the model directories of the backends in use
+    enrolled_users = 0
+    for models_dir in active_models_dirs():
+        enrolled_users += _count_models(models_dir)
+    
+    body = json.dumps({
+        'enrolled_users': enrolled_users,
+        'models_directories': {
+            'gmm': authenticator.models_dir,
+            'embeddings': speaker_verifier.models_dir,
+            'robust': robust_verifier.models_dir,
+            'hybrid': hybrid_verifier.models_dir
+        },
+        'version': 'authentication-only',
+        'note': 'Voice authentication service - no microphone required'
+    }).encode('utf-8')
+    
+    return body, hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
 @app.route('/system/info', methods=['GET'])
 def system_info():
     """Get system information"""
+    global _system_info_cache
     try:
-        # Count enrolled users across all model directories
-        enrolled_users = 0
-        for models_dir in [authenticator.models_dir, speaker_verifier.models_dir, 
-                          robust_verifier.models_dir, hybrid_verifier.models_dir]:
-            if os.path.exists(models_dir):
-                enrolled_users += len([f for f in os.listdir(models_dir) 
-                                     if f.endswith('.pkl')])
+        # Directory mtimes change whenever a model file is added, replaced or removed
+        state = models_dirs_state()
+        cached = _system_info_cache
+        if cached is None or cached[0] != state:
+            cached = (state,) + build_system_info()
+            _system_info_cache = cached
+        _, body, etag = cached
         
-        return jsonify({
-            'enrolled_users': enrolled_users,
-            'models_directories': {
-                'gmm': authenticator.models_dir,
-                'embeddings': speaker_verifier.models_dir,
-                'robust': robust_verifier.models_dir,
-                'hybrid': hybrid_verifier.models_dir
-            },
-            'version': 'authentication-only',
-            'note': 'Voice authentication service - no microphone required'
-        })
+        # Answers 304 Not Modified when the client already has this ETag
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        return response.make_conditional(request)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -292,10 +690,22 @@ if __name__ == '__main__':
     print("  POST /auth/enroll - Enroll user")
     print("  POST /auth/verify - Verify user")
     print("  POST /auth/identify - Identify user")
+    if ALLOW_CLIENT_EMBEDDINGS:
+        print("  POST /auth/verify_embedding - Verify user from client fingerprint")
+        print("  POST /auth/identify_embedding - Identify user from client fingerprint")
     print("  POST /auth/delete - Delete user")
     print("  GET  /system/info - System info")
     print("\n✅ Voice authentication ready!")
     print("🔐 Authentication-only service - voice commands removed")
     print("\n🔊 Voice Authentication Server running on: http://localhost:5001")
     
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    if USE_PRODUCTION_SERVER:
+        # Single process with a thread pool so the in-memory models are loaded once
+        from waitress import serve
+        print(f"⚙️  Production mode: waitress with {PRODUCTION_THREADS} threads")
+        serve(app, host='0.0.0.0', port=5001, threads=PRODUCTION_THREADS)
+    else:
+        # HTTP/1.1 keeps client connections alive between requests
+        WSGIRequestHandler.protocol_version = "HTTP/1.1"
+        # No reloader: it would start a second process and load every model twice
+        app.run(host='0.0.0.0', port=5001, debug=DEBUG_MODE, use_reloader=False, threaded=True)
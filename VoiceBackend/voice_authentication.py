@@ -7,10 +7,32 @@ Uses MFCC (Mel-Frequency Cepstral Coefficients) and GMM (Gaussian Mixture Models
 import numpy as np
 import pickle
 import os
-from python_speech_features import mfcc
+from math import gcd
+from numpy.lib.stride_tricks import sliding_window_view
+from python_speech_features import get_filterbanks
+from python_speech_features.sigproc import round_half_up
+from scipy.fft import rfft
+from scipy.fftpack import dct
+from scipy.signal import resample_poly
 from sklearn.mixture import GaussianMixture
 import soundfile as sf
 import librosa
+import voice_gmm_kernels
+
+# Models are saved as raw parameter arrays; older pickled GaussianMixture
+# models are still loaded until the user re-enrolls
+MODEL_EXT = '.npz'
+LEGACY_MODEL_EXT = '.pkl'
+
+# Higher-rate input is downsampled to this before feature extraction
+TARGET_SAMPLE_RATE = 16000
+
+# Feature pipeline a model was trained on, saved in its .npz. Version 2 drops
+# silent frames (energy VAD) before normalization; models without the field
+# (version 1, including legacy .pkl) keep being scored on all frames until the
+# user re-enrolls
+FEATURE_VERSION = 2
+VAD_FEATURE_VERSION = 2
 
 
 class VoiceAuthenticator:
@@ -19,45 +41,283 @@ class VoiceAuthenticator:
     Enrolls users and verifies their identity through voice
     """
     
-    def __init__(self, models_dir="voice_models"):
+    def __init__(self, models_dir="voice_models", n_components=8, max_iter=100):
         """
         Initialize the voice authenticator
         
         Args:
             models_dir: Directory to store voice models
+            n_components: Gaussian components per user GMM
+            max_iter: Maximum EM iterations when enrolling
         """
         self.models_dir = models_dir
         if not os.path.exists(models_dir):
             os.makedirs(models_dir)
         
+        # IDs with a saved model, kept in sync on enroll/delete so unknown
+        # users can be rejected before any audio is decoded
+        self._enrolled_ids = set(self._model_files())
+        
         # GMM parameters
-        self.n_components = 16  # Number of Gaussian components
+        # 8 components is enough for 13-dim MFCCs and halves EM cost per iteration;
+        # models enrolled with more components still load and score normally
+        self.n_components = n_components  # Number of Gaussian components
+        self.max_iter = max_iter
         self.n_mfcc = 13  # Number of MFCC coefficients
+        self.n_filters = 26  # Mel filters
+        self.n_fft = 512
+        self.vad_range_db = 30  # Frames this far below the loudest are silence
+        self.min_voiced_frames = 20  # Keep every frame if the VAD would leave fewer
+        
+        # DCT-II basis with the cepstral lifter (L=22) folded in, and
+        # per-sample-rate framing/filterbank, built once instead of on every
+        # extract_features call
+        lifter = 1 + 11.0 * np.sin(np.pi * np.arange(self.n_mfcc) / 22)
+        self._cepstral_basis = (dct(np.eye(self.n_filters), type=2, axis=1, norm='ortho')
+                                [:, :self.n_mfcc] * lifter)
+        self._mfcc_setup = {}
         
-    def extract_features(self, audio_data, sample_rate=16000):
+        # Scoring parameters of loaded models:
+        # {model_path: (mtime_ns, params)}, reloaded only when the file changes
+        self._model_cache = {}
+        
+        # Stacked GMM parameters of all enrolled users for identification:
+        # (ids, score_weights, score_bias, offsets, counts, vad), published as
+        # one tuple so server threads never see half of a rebuild (built lazily
+        # by build_identification_matrix, reset to None on enroll/delete)
+        self._id_index = None
+        
+    def extract_features(self, audio_data, sample_rate=16000, vad=True):
         """
         Extract MFCC features from audio data
         
         Args:
             audio_data: Audio samples as numpy array
             sample_rate: Sample rate of audio
+            vad: Drop silent frames (False for models from before FEATURE_VERSION 2)
             
         Returns:
             MFCC features as numpy array
         """
-        # Extract MFCC features
-        features = mfcc(audio_data, 
-                       samplerate=sample_rate,
-                       numcep=self.n_mfcc,
-                       nfilt=26,
-                       nfft=512,
-                       appendEnergy=True)
+        # Extract MFCC features (same as python_speech_features.mfcc with
+        # numcep=13, nfilt=26, nfft=512, appendEnergy=True)
+        frame_len, frame_step, filterbank_t = self._get_mfcc_setup(sample_rate)
+        
+        # Pre-emphasis
+        signal = np.append(audio_data[0], audio_data[1:] - 0.97 * audio_data[:-1])
+        
+        # Overlapping frames as a strided view of the zero-padded signal
+        if len(signal) <= frame_len:
+            num_frames = 1
+        else:
+            num_frames = 1 + int(np.ceil((1.0 * len(signal) - frame_len) / frame_step))
+        pad_len = (num_frames - 1) * frame_step + frame_len
+        padded = np.concatenate((signal, np.zeros(pad_len - len(signal))))
+        frames = sliding_window_view(padded, frame_len)[::frame_step]
         
-        # Normalize features
-        features = (features - np.mean(features, axis=0)) / (np.std(features, axis=0) + 1e-8)
+        # Frames zero-padded (or truncated) to n_fft in one contiguous buffer,
+        # so the batched FFT below needs no extra copy
+        fft_frames = np.zeros((num_frames, self.n_fft))
+        width = min(frame_len, self.n_fft)
+        fft_frames[:, :width] = frames[:, :width]
+        
+        # Power spectrum, frame energy and log Mel filterbank energies
+        # (one batched pocketfft call over all frames, threaded across cores)
+        spectrum = rfft(fft_frames, axis=-1, workers=-1, overwrite_x=True)
+        power_spec = (np.square(spectrum.real) + np.square(spectrum.imag)) / self.n_fft
+        energy = np.sum(power_spec, 1)
+        energy = np.where(energy == 0, np.finfo(float).eps, energy)
+        mel_energies = np.dot(power_spec, filterbank_t)
+        mel_energies = np.where(mel_energies == 0, np.finfo(float).eps, mel_energies)
+        
+        # Cepstra, liftered, with c0 replaced by the log frame energy.
+        # float32 from here on: half the bytes through normalization and GMM fit/score
+        features = (np.log(mel_energies) @ self._cepstral_basis).astype(np.float32)
+        features[:, 0] = np.log(energy)
+        
+        # Energy VAD: drop near-silent frames so leading/trailing silence neither
+        # dilutes the GMM nor costs scoring time. Frames must be above mean - 2 std
+        # and within 30 dB of the loudest frame (the statistical gate alone misses
+        # long silences, which drag the mean down with them)
+        if vad:
+            log_energy = features[:, 0]
+            vad_floor = max(log_energy.mean() - 2 * log_energy.std(),
+                            log_energy.max() - self.vad_range_db * np.log(10) / 10)
+            voiced = log_energy > vad_floor
+            if np.count_nonzero(voiced) >= self.min_voiced_frames:
+                features = features[voiced]
+        
+        # Normalize features (in place)
+        mean = features.mean(axis=0, keepdims=True)
+        std = features.std(axis=0, keepdims=True)
+        np.add(std, 1e-8, out=std)
+        np.subtract(features, mean, out=features)
+        np.divide(features, std, out=features)
         
         return features
     
+    @staticmethod
+    def _load_audio(audio_file_path, audio_data, sample_rate):
+        """
+        Audio from a file or an array, downmixed to mono and downsampled
+        to TARGET_SAMPLE_RATE if recorded above it
+        
+        Returns:
+            (audio_data, sample_rate)
+        """
+        if audio_file_path:
+            audio_data, sample_rate = sf.read(audio_file_path, dtype='float32')
+        elif audio_data is None:
+            raise ValueError("Either audio_file_path or audio_data must be provided")
+        
+        # Convert to mono if stereo (float32 result: half the bytes of np.mean's default)
+        if audio_data.ndim > 1:
+            audio_data = audio_data.mean(axis=1, dtype=np.float32)
+        
+        # 44.1/48 kHz input would otherwise run the whole MFCC pipeline on ~3x the samples
+        if sample_rate > TARGET_SAMPLE_RATE:
+            g = gcd(int(sample_rate), TARGET_SAMPLE_RATE)
+            audio_data = resample_poly(
+                audio_data, TARGET_SAMPLE_RATE // g, int(sample_rate) // g
+            ).astype(np.float32)
+            sample_rate = TARGET_SAMPLE_RATE
+        return audio_data, sample_rate
+    
+    def _get_mfcc_setup(self, sample_rate):
+        """Frame length/step (samples) and transposed Mel filterbank for a sample rate"""
+        setup = self._mfcc_setup.get(sample_rate)
+        if setup is None:
+            filterbank = get_filterbanks(self.n_filters, self.n_fft, sample_rate, 0, sample_rate / 2)
+            setup = (int(round_half_up(0.025 * sample_rate)),
+                     int(round_half_up(0.01 * sample_rate)),
+                     filterbank.T)
+            self._mfcc_setup[sample_rate] = setup
+        return setup
+    
+    def _model_files(self):
+        """{user_id: model_path} for every saved model (.npz preferred over legacy .pkl)"""
+        models = {}
+        for model_file in sorted(os.listdir(self.models_dir)):
+            stem, ext = os.path.splitext(model_file)
+            if not stem.startswith('user_'):
+                continue
+            user_id = stem[len('user_'):]
+            if ext == MODEL_EXT or (ext == LEGACY_MODEL_EXT and user_id not in models):
+                models[user_id] = os.path.join(self.models_dir, model_file)
+        return models
+    
+    def _model_path(self, user_id):
+        """Saved model file for user_id, or None if not enrolled"""
+        for ext in (MODEL_EXT, LEGACY_MODEL_EXT):
+            model_path = os.path.join(self.models_dir, f"user_{user_id}{ext}")
+            if os.path.exists(model_path):
+                return model_path
+        return None
+    
+    def _load_model(self, model_path):
+        """
+        Load a user's model, reusing the in-memory copy while the file is unchanged
+        
+        Returns:
+            ((means, precisions, log_consts), feature_version) - scoring arrays
+            (see voice_gmm_kernels) and the FEATURE_VERSION the model was trained on
+        """
+        mtime_ns = os.stat(model_path).st_mtime_ns
+        cached = self._model_cache.get(model_path)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        
+        if model_path.endswith(MODEL_EXT):
+            with np.load(model_path) as data:
+                params = voice_gmm_kernels.params_from_arrays(
+                    data['weights'], data['means'], data['precisions'])
+                feature_version = int(data['feature_version']) if 'feature_version' in data else 1
+        else:
+            with open(model_path, 'rb') as f:
+                params = voice_gmm_kernels.gmm_params(pickle.load(f))
+            feature_version = 1
+        
+        self._model_cache[model_path] = (mtime_ns, (params, feature_version))
+        return params, feature_version
+    
+    def build_identification_matrix(self):
+        """
+        Load every enrolled GMM once and stack their parameters so that
+        identify_user can score all users with a few matrix products
+        instead of one gmm.score call per user
+        
+        Returns:
+            Number of enrolled users in the matrix
+        """
+        return len(self._build_id_index()[0])
+    
+    def _build_id_index(self):
+        """Build, publish and return the identification index tuple"""
+        ids = []
+        means, precisions, log_consts, offsets, vad = [], [], [], [], []
+        n_rows = 0
+        
+        for user_id, model_path in self._model_files().items():
+            (user_means, user_precisions, user_log_consts), feature_version = \
+                self._load_model(model_path)
+            
+            ids.append(user_id)
+            vad.append(feature_version >= VAD_FEATURE_VERSION)
+            means.append(user_means)
+            precisions.append(user_precisions)
+            log_consts.append(user_log_consts)
+            offsets.append(n_rows)
+            n_rows += len(user_log_consts)
+        
+        if ids:
+            # float64: the expanded form below subtracts large terms
+            means = np.vstack(means).astype(np.float64)
+            precisions = np.vstack(precisions).astype(np.float64)
+            
+            # -0.5 * sum((x - mu)^2 * prec) = -0.5 * [x^2, x] @ [prec; -2 mu prec] + const,
+            # so scoring is one matrix product against these precomputed weights
+            score_weights = np.vstack([precisions.T, -2 * (means * precisions).T])
+            # Constant term plus (mixture weight + Gaussian normalization) per component
+            score_bias = (-0.5 * np.sum(means ** 2 * precisions, axis=1)
+                          + np.concatenate(log_consts))
+            offsets = np.array(offsets)
+            counts = np.diff(np.append(offsets, n_rows))
+            # Last field: which users' models expect VAD-trimmed features
+            index = (tuple(ids), score_weights, score_bias, offsets, counts, np.array(vad))
+        else:
+            index = ((), None, None, None, None, None)
+        
+        # One assignment: readers see either the old index or the new one
+        self._id_index = index
+        return index
+    
+    @staticmethod
+    def _score_all(features, index):
+        """
+        Average log-likelihood of features under every enrolled GMM
+        Equivalent to [gmm.score(features) for each user], computed in one pass
+        
+        Args:
+            features: Feature matrix (n_frames, n_features)
+            index: Identification index from _build_id_index
+            
+        Returns:
+            Scores as numpy array (n_users,)
+        """
+        _, score_weights, score_bias, offsets, counts, _ = index
+        
+        # Log-probability of every frame under every component: one GEMM
+        log_prob = np.hstack([features ** 2, features]) @ score_weights
+        log_prob *= -0.5
+        log_prob += score_bias
+        
+        # Per-user logsumexp over that user's components
+        max_prob = np.maximum.reduceat(log_prob, offsets, axis=1)
+        summed = np.add.reduceat(np.exp(log_prob - np.repeat(max_prob, counts, axis=1)),
+                                 offsets, axis=1)
+        
+        return np.mean(max_prob + np.log(summed), axis=0)
+    
     def enroll_user(self, user_id, audio_file_path=None, audio_data=None, sample_rate=16000):
         """
         Enroll a new user by training a GMM model on their voice
@@ -72,15 +332,8 @@ class VoiceAuthenticator:
             True if enrollment successful, False otherwise
         """
         try:
-            # Load audio
-            if audio_file_path:
-                audio_data, sample_rate = sf.read(audio_file_path)
-            elif audio_data is None:
-                raise ValueError("Either audio_file_path or audio_data must be provided")
-            
-            # Convert to mono if stereo
-            if len(audio_data.shape) > 1:
-                audio_data = np.mean(audio_data, axis=1)
+            # Load audio (mono)
+            audio_data, sample_rate = self._load_audio(audio_file_path, audio_data, sample_rate)
             
             # Extract features
             features = self.extract_features(audio_data, sample_rate)
@@ -88,14 +341,33 @@ class VoiceAuthenticator:
             # Train GMM model
             gmm = GaussianMixture(n_components=self.n_components,
                                  covariance_type='diag',
-                                 max_iter=200,
+                                 max_iter=self.max_iter,
+                                 tol=1e-3,
+                                 reg_covar=1e-4,
+                                 init_params='k-means++',
                                  random_state=42)
             gmm.fit(features)
             
-            # Save model
-            model_path = os.path.join(self.models_dir, f"user_{user_id}.pkl")
-            with open(model_path, 'wb') as f:
-                pickle.dump(gmm, f)
+            # Save model parameters (written to a temp file, then swapped in)
+            model_path = os.path.join(self.models_dir, f"user_{user_id}{MODEL_EXT}")
+            with open(model_path + '.tmp', 'wb') as f:
+                np.savez(f,
+                         weights=gmm.weights_.astype(np.float32),
+                         means=gmm.means_.astype(np.float32),
+                         precisions=gmm.precisions_.astype(np.float32),
+                         feature_version=np.int32(FEATURE_VERSION))
+            os.replace(model_path + '.tmp', model_path)
+            
+            # Drop a pickled model from before the .npz format
+            legacy_path = os.path.join(self.models_dir, f"user_{user_id}{LEGACY_MODEL_EXT}")
+            if os.path.exists(legacy_path):
+                os.remove(legacy_path)
+                self._model_cache.pop(legacy_path, None)
+            
+            self._enrolled_ids.add(str(user_id))
+            
+            # Rebuild identification matrix on next identify
+            self._id_index = None
             
             print(f"✓ User {user_id} enrolled successfully")
             return True
@@ -121,29 +393,22 @@ class VoiceAuthenticator:
         """
         try:
             # Load user's model
-            model_path = os.path.join(self.models_dir, f"user_{user_id}.pkl")
-            if not os.path.exists(model_path):
+            model_path = self._model_path(user_id)
+            if model_path is None:
                 print(f"✗ No model found for user {user_id}")
                 return False, 0.0
             
-            with open(model_path, 'rb') as f:
-                gmm = pickle.load(f)
-            
-            # Load audio
-            if audio_file_path:
-                audio_data, sample_rate = sf.read(audio_file_path)
-            elif audio_data is None:
-                raise ValueError("Either audio_file_path or audio_data must be provided")
+            params, feature_version = self._load_model(model_path)
             
-            # Convert to mono if stereo
-            if len(audio_data.shape) > 1:
-                audio_data = np.mean(audio_data, axis=1)
+            # Load audio (mono)
+            audio_data, sample_rate = self._load_audio(audio_file_path, audio_data, sample_rate)
             
-            # Extract features
-            features = self.extract_features(audio_data, sample_rate)
+            # Extract features the way the model was trained
+            features = self.extract_features(audio_data, sample_rate,
+                                             vad=feature_version >= VAD_FEATURE_VERSION)
             
             # Calculate log-likelihood
-            log_likelihood = gmm.score(features)
+            log_likelihood = voice_gmm_kernels.score(features, params)
             
             # Normalize score to 0-100 range
             confidence = min(100, max(0, (log_likelihood - threshold) * 2 + 50))
@@ -172,35 +437,35 @@ class VoiceAuthenticator:
             (user_id, confidence) or (None, 0.0) if no match
         """
         try:
-            # Load audio
-            if audio_file_path:
-                audio_data, sample_rate = sf.read(audio_file_path)
-            elif audio_data is None:
-                raise ValueError("Either audio_file_path or audio_data must be provided")
+            # Load audio (mono)
+            audio_data, sample_rate = self._load_audio(audio_file_path, audio_data, sample_rate)
             
-            # Convert to mono if stereo
-            if len(audio_data.shape) > 1:
-                audio_data = np.mean(audio_data, axis=1)
-            
-            # Extract features
-            features = self.extract_features(audio_data, sample_rate)
+            # Test against all enrolled users at once. The index is read once:
+            # an enroll/delete on another thread may reset it meanwhile
+            index = self._id_index
+            if index is None:
+                index = self._build_id_index()
+            ids, vad = index[0], index[5]
             
-            # Test against all enrolled users
             best_score = float('-inf')
             best_user = None
             
-            for model_file in os.listdir(self.models_dir):
-                if model_file.endswith('.pkl'):
-                    user_id = model_file.replace('user_', '').replace('.pkl', '')
-                    
-                    with open(os.path.join(self.models_dir, model_file), 'rb') as f:
-                        gmm = pickle.load(f)
-                    
-                    score = gmm.score(features)
-                    
-                    if score > best_score:
-                        best_score = score
-                        best_user = user_id
+            if ids:
+                # Each model is scored on features extracted the way it was
+                # trained; both sets only while pre-VAD models remain
+                if vad.all():
+                    scores = self._score_all(self.extract_features(audio_data, sample_rate), index)
+                elif not vad.any():
+                    scores = self._score_all(
+                        self.extract_features(audio_data, sample_rate, vad=False), index)
+                else:
+                    scores = np.where(
+                        vad,
+                        self._score_all(self.extract_features(audio_data, sample_rate), index),
+                        self._score_all(self.extract_features(audio_data, sample_rate, vad=False), index))
+                best_index = int(np.argmax(scores))
+                best_score = scores[best_index]
+                best_user = ids[best_index]
             
             if best_score > threshold:
                 confidence = float(min(100, max(0, (best_score - threshold) * 2 + 50)))
@@ -214,6 +479,10 @@ class VoiceAuthenticator:
             print(f"✗ Identification failed: {str(e)}")
             return None, 0.0
     
+    def is_enrolled(self, user_id):
+        """Check whether user_id has a saved model (no disk access)"""
+        return str(user_id) in self._enrolled_ids
+    
     def delete_user(self, user_id):
         """
         Delete a user's voice model
@@ -225,9 +494,17 @@ class VoiceAuthenticator:
             True if deleted, False otherwise
         """
         try:
-            model_path = os.path.join(self.models_dir, f"user_{user_id}.pkl")
-            if os.path.exists(model_path):
-                os.remove(model_path)
+            deleted = False
+            for ext in (MODEL_EXT, LEGACY_MODEL_EXT):
+                model_path = os.path.join(self.models_dir, f"user_{user_id}{ext}")
+                if os.path.exists(model_path):
+                    os.remove(model_path)
+                    self._model_cache.pop(model_path, None)
+                    deleted = True
+            
+            if deleted:
+                self._enrolled_ids.discard(str(user_id))
+                self._id_index = None
                 print(f"✓ User {user_id} deleted")
                 return True
             else:
@@ -0,0 +1,100 @@
+"""
+Diagonal-covariance GMM scoring kernels for VoiceAuthenticator
+Same result as GaussianMixture.score without sklearn's per-call overhead;
+compiled with numba when installed, plain numpy otherwise
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def params_from_arrays(weights, means, precisions):
+    """
+    Contiguous float32 scoring parameters for a diagonal GMM
+
+    Args:
+        weights: Mixture weights (n_components,)
+        means: Component means (n_components, n_features)
+        precisions: Diagonal precisions, 1 / variance (n_components, n_features)
+
+    Returns:
+        (means, precisions, log_consts)
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    precisions64 = np.asarray(precisions, dtype=np.float64)
+    # log weight + Gaussian normalization constant per component
+    log_consts = (np.log(weights)
+                  + 0.5 * np.sum(np.log(precisions64), axis=1)
+                  - 0.5 * precisions64.shape[1] * np.log(2 * np.pi)).astype(np.float32)
+    return (np.ascontiguousarray(means, dtype=np.float32),
+            np.ascontiguousarray(precisions, dtype=np.float32),
+            log_consts)
+
+
+def gmm_params(gmm):
+    """
+    Scoring parameters from a fitted sklearn GaussianMixture (diagonal only)
+
+    Returns:
+        (means, precisions, log_consts)
+    """
+    if gmm.covariance_type != 'diag':
+        raise ValueError(f"Unsupported covariance type: {gmm.covariance_type}")
+    return params_from_arrays(gmm.weights_, gmm.means_, gmm.precisions_)
+
+
+if njit is not None:
+    # nogil: concurrent verify requests on the server's worker threads score in
+    # parallel. Serial within a call (no parallel=True / prange): an utterance is
+    # a few hundred frames, and numba's workqueue threading layer aborts the
+    # process when several threads enter a parallel kernel at once
+    @njit(cache=True, fastmath=True, nogil=True)
+    def _score_kernel(features, means, precisions, log_consts):
+        n_frames, n_features = features.shape
+        n_components = means.shape[0]
+        log_prob = np.empty(n_components)
+        total = 0.0
+        for t in range(n_frames):
+            for c in range(n_components):
+                s = 0.0
+                for d in range(n_features):
+                    diff = features[t, d] - means[c, d]
+                    s += diff * diff * precisions[c, d]
+                log_prob[c] = log_consts[c] - 0.5 * s
+            # logsumexp over components
+            best = log_prob[0]
+            for c in range(1, n_components):
+                if log_prob[c] > best:
+                    best = log_prob[c]
+            acc = 0.0
+            for c in range(n_components):
+                acc += np.exp(log_prob[c] - best)
+            total += best + np.log(acc)
+        return total / n_frames
+
+
+def score(features, params):
+    """
+    Average per-frame log-likelihood of features under a diagonal GMM
+
+    Args:
+        features: Feature matrix (n_frames, n_features)
+        params: Output of gmm_params
+
+    Returns:
+        Mean log-likelihood (float)
+    """
+    means, precisions, log_consts = params
+    features = np.ascontiguousarray(features, dtype=np.float32)
+    if njit is not None:
+        return float(_score_kernel(features, means, precisions, log_consts))
+
+    log_prob = -0.5 * ((features ** 2) @ precisions.T
+                       - 2 * features @ (means * precisions).T
+                       + np.sum(means ** 2 * precisions, axis=1)) + log_consts
+    best = log_prob.max(axis=1, keepdims=True)
+    return float(np.mean(best[:, 0] + np.log(np.exp(log_prob - best).sum(axis=1))))
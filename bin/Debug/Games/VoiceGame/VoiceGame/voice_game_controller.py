@@ -5,11 +5,14 @@ Commands work based on button positions, not strict screen tracking
 
 import json
 import time
-import queue
+import heapq
+import itertools
 import sys
 import subprocess
 import os
 import threading
+from collections import deque
+from functools import partial
 
 def check_deps():
     m = []
@@ -50,6 +53,54 @@ keyboard = KeyboardController()
 pyautogui.FAILSAFE = False
 pyautogui.PAUSE = 0  # No delay for fast gameplay
 
+# Direct Win32 clicks: move + left down + left up in one SendInput call,
+# skipping pyautogui's per-click overhead (pyautogui is used elsewhere)
+if sys.platform == "win32":
+    import ctypes
+    from ctypes import wintypes
+
+    class MOUSEINPUT(ctypes.Structure):
+        _fields_ = [("dx", wintypes.LONG), ("dy", wintypes.LONG),
+                    ("mouseData", wintypes.DWORD), ("dwFlags", wintypes.DWORD),
+                    ("time", wintypes.DWORD), ("dwExtraInfo", ctypes.c_size_t)]
+
+    class INPUT(ctypes.Structure):
+        # MOUSEINPUT is the largest member of the INPUT union, so this has its size
+        _fields_ = [("type", wintypes.DWORD), ("mi", MOUSEINPUT)]
+
+    INPUT_MOUSE = 0
+    MOUSEEVENTF_MOVE = 0x0001
+    MOUSEEVENTF_LEFTDOWN = 0x0002
+    MOUSEEVENTF_LEFTUP = 0x0004
+    MOUSEEVENTF_VIRTUALDESK = 0x4000
+    MOUSEEVENTF_ABSOLUTE = 0x8000
+    SM_XVIRTUALSCREEN, SM_YVIRTUALSCREEN, SM_CXVIRTUALSCREEN, SM_CYVIRTUALSCREEN = 76, 77, 78, 79
+
+    _user32 = ctypes.WinDLL("user32", use_last_error=True)
+    _SendInput = _user32.SendInput
+    _SendInput.argtypes = (wintypes.UINT, ctypes.POINTER(INPUT), ctypes.c_int)
+    _SendInput.restype = wintypes.UINT
+    _GetSystemMetrics = _user32.GetSystemMetrics
+
+    def send_click(x, y):
+        """Left click at screen pixel (x, y) with a single SendInput; True if sent"""
+        # Absolute coordinates are normalized to 0..65535 across the virtual desktop
+        vx = _GetSystemMetrics(SM_XVIRTUALSCREEN)
+        vy = _GetSystemMetrics(SM_YVIRTUALSCREEN)
+        vw = max(_GetSystemMetrics(SM_CXVIRTUALSCREEN) - 1, 1)
+        vh = max(_GetSystemMetrics(SM_CYVIRTUALSCREEN) - 1, 1)
+        inputs = (INPUT * 3)()
+        for inp in inputs:
+            inp.type = INPUT_MOUSE
+        inputs[0].mi.dx = (x - vx) * 65535 // vw
+        inputs[0].mi.dy = (y - vy) * 65535 // vh
+        inputs[0].mi.dwFlags = MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_VIRTUALDESK
+        inputs[1].mi.dwFlags = MOUSEEVENTF_LEFTDOWN
+        inputs[2].mi.dwFlags = MOUSEEVENTF_LEFTUP
+        return _SendInput(3, inputs, ctypes.sizeof(INPUT)) == 3
+else:
+    send_click = None
+
 # ============================================================
 # ALL BUTTON POSITIONS (x%, y%)
 # These positions work across multiple screens
@@ -176,17 +227,53 @@ GAMEPLAY_COMMANDS = [
     "home", "replay"
 ]
 
+# Every command, as the Vosk grammar JSON - built once at import
+_ALL_COMMANDS_JSON = json.dumps(sorted({
+    *SYSTEM_COMMANDS, *NAV_BUTTONS, *MAIN_MENU_BUTTONS, *GAME_MODE_BUTTONS,
+    *MODE_OPTIONS, *SETTINGS_BUTTONS, *HELP_BUTTONS, *GAMEPLAY_BUTTONS,
+    *PAUSE_MENU_BUTTONS, *CONFIRM_BUTTONS, *RESULT_SCREEN_BUTTONS,
+    *GAMEPLAY_KEYS, *GAMEPLAY_COMMANDS, *VOLUME_COMMANDS,
+}))
+
+# Recognized text -> the interned command string, so dispatch lookups and
+# repeat checks on known commands compare by identity
+_VOCAB = {c: sys.intern(c) for c in json.loads(_ALL_COMMANDS_JSON)}
+
 # Key tap duration
 KEY_TAP_DURATION = 0.1
 STEER_HOLD_DURATION = 0.3  # Hold left/right for 0.3 seconds
 
 MIN_CONFIDENCE = 0.60  # Lower threshold for faster response
 STEER_COOLDOWN = 0.05  # Very fast cooldown for rapid steering
+WINDOW_CACHE_TTL = 0.5  # Reuse the game window's position/size for this long
+
+# Microphone input: 16 kHz mono int16 in 100 ms blocks
+SAMPLE_RATE = 16000
+AUDIO_BLOCKSIZE = 1600
+AUDIO_SLOTS = 64  # Blocks the audio ring buffer holds (~6s)
+
+
+def read_partial_text(s):
+    """
+    Text of a Vosk PartialResult() string, e.g. '{"partial" : "left"}',
+    sliced out directly: it is read every audio block, usually to find it empty
+    """
+    if s.count('"') == 4 and '\\' not in s:
+        return s[s.index('"', s.index(':')) + 1:s.rindex('"')].strip()
+    return json.loads(s).get("partial", "").strip()
 
 
 class VoiceController:
     def __init__(self):
-        self.audio_queue = queue.Queue()
+        # Audio from the sounddevice callback (single producer, single consumer):
+        # blocks are copied into a preallocated ring and their (offset, length)
+        # queued; the oldest are dropped if the voice loop falls ~6s behind
+        self._slot_bytes = AUDIO_BLOCKSIZE * 2
+        self._ring = bytearray(self._slot_bytes * AUDIO_SLOTS)
+        self._ring_view = memoryview(self._ring)
+        self._ring_off = 0
+        self._buf = deque(maxlen=AUDIO_SLOTS)
+        self._buf_evt = threading.Event()
         self.game_active = False
         self.app_id = "Playgama.MRRACER-CarRacing_a9mympr8mvnem!App"
         self.window_title = "MR RACER"
@@ -196,30 +283,111 @@ class VoiceController:
         self.held_button = None
         self.accelerating = False  # Track if acceleration is held
         self.in_gameplay = False   # Track if we're in gameplay mode
+        self._win = None           # Cached game window (found once, not per click)
+        self._win_rect = None      # (left, top, width, height) of the cached window
+        self._win_rect_time = 0
+        
+        # Timed key releases run on one background thread so a steer/tap never
+        # stalls the voice loop for the hold duration. Pending releases are a
+        # heap ordered by deadline; _held maps each pressed key to the deadline
+        # it is released at (the latest of its holds) and the callbacks to run then
+        self._release_heap = []
+        self._release_seq = itertools.count()  # Tie-breaker, keys aren't orderable
+        self._release_cond = threading.Condition()
+        self._held = {}
+        
+        # Decoder for Vosk results, called directly (json.loads re-checks its
+        # arguments and options on every call)
+        self._decode = json.JSONDecoder().decode
+        threading.Thread(target=self._key_release_worker, daemon=True).start()
+        
+        # Command -> handler, built once so execute_command is a single lookup.
+        # System commands work without the game; the rest need it running
+        self._system_dispatch = {}
+        for cmd in ["open mr racer", "play mr racer", "start mr racer"]:
+            self._system_dispatch[cmd] = self.launch_game
+        for cmd in ["quit game", "close game"]:
+            self._system_dispatch[cmd] = self.close_game
+        self._dispatch = self._build_dispatch()
+
+    def _build_dispatch(self):
+        """Game command handlers; the first entry for a command wins"""
+        dispatch = {}
+        
+        def add(cmds, handler):
+            for cmd in cmds:
+                dispatch.setdefault(sys.intern(cmd), handler)
+        
+        def add_clicks(buttons):
+            for cmd, pos in buttons.items():
+                dispatch.setdefault(sys.intern(cmd), partial(self.click_at, pos))
+        
+        # Screen buttons (navigation, main menu, game mode, mode options)
+        add_clicks(NAV_BUTTONS)
+        add_clicks(MAIN_MENU_BUTTONS)
+        add_clicks(GAME_MODE_BUTTONS)
+        add_clicks(MODE_OPTIONS)
+        # Start button (to start a race from mode selection)
+        add(["start", "play"], partial(self.click_at, START_BUTTON))
+        add_clicks(SETTINGS_BUTTONS)
+        add_clicks(HELP_BUTTONS)
+        
+        # Volume controls
+        add(["bg music increase"], partial(self.drag_dial, BG_MUSIC_DIAL, "increase"))
+        add(["bg music decrease"], partial(self.drag_dial, BG_MUSIC_DIAL, "decrease"))
+        add(["sound fx increase"], partial(self.drag_dial, SOUND_FX_DIAL, "increase"))
+        add(["sound fx decrease"], partial(self.drag_dial, SOUND_FX_DIAL, "decrease"))
+        
+        # Gameplay buttons (click) - only pause uses screen click
+        add_clicks(GAMEPLAY_BUTTONS)
+        
+        # Racing, pause menu, confirmation and result screen
+        add(["start race", "go", "race"], self.start_acceleration)
+        add(["brake"], self.brake)
+        add(["stop", "pause game"], self.pause_game)
+        add(["continue", "resume"], self.resume_race)
+        add(["restart"], self.restart_race)
+        add(["main menu"], self.open_main_menu)
+        add(["camera"], self.camera)
+        add_clicks(CONFIRM_BUTTONS)
+        add(["home"], self.go_home)
+        add(["replay"], self.replay_race)
+        
+        # Gameplay keyboard controls - other actions (left, right, horn)
+        for cmd, key_name in GAMEPLAY_KEYS.items():
+            if cmd not in ["brake", "accelerate", "gas"]:
+                add([cmd], partial(self.press_key, key_name, cmd))
+        
+        # Accelerate/gas - start acceleration if not already
+        add(["accelerate", "gas"], self.start_acceleration)
+        add(["straight", "release"], self.release_steering)
+        return dispatch
 
     def get_all_commands(self):
         """All commands for Vosk grammar"""
-        cmds = SYSTEM_COMMANDS.copy()
-        cmds += list(NAV_BUTTONS.keys())
-        cmds += list(MAIN_MENU_BUTTONS.keys())
-        cmds += list(GAME_MODE_BUTTONS.keys())
-        cmds += list(MODE_OPTIONS.keys())
-        cmds += list(SETTINGS_BUTTONS.keys())
-        cmds += list(HELP_BUTTONS.keys())
-        cmds += list(GAMEPLAY_BUTTONS.keys())
-        cmds += list(PAUSE_MENU_BUTTONS.keys())
-        cmds += list(CONFIRM_BUTTONS.keys())
-        cmds += list(RESULT_SCREEN_BUTTONS.keys())
-        cmds += list(GAMEPLAY_KEYS.keys())
-        cmds += GAMEPLAY_COMMANDS
-        cmds += VOLUME_COMMANDS
-        return list(set(cmds))
+        return json.loads(_ALL_COMMANDS_JSON)
 
     def get_window(self):
+        """Game window, cached; its geometry is re-read at most every WINDOW_CACHE_TTL"""
+        now = time.monotonic()
+        if self._win is not None:
+            if now - self._win_rect_time < WINDOW_CACHE_TTL:
+                return self._win
+            try:
+                # Raises once the window is gone
+                self._win_rect = (self._win.left, self._win.top, self._win.width, self._win.height)
+                self._win_rect_time = now
+                return self._win
+            except:
+                self._win = None
         try:
             windows = gw.getWindowsWithTitle(self.window_title)
             if windows:
-                return windows[0]
+                win = windows[0]
+                self._win_rect = (win.left, win.top, win.width, win.height)
+                self._win_rect_time = now
+                self._win = win
+                return win
         except:
             pass
         return None
@@ -237,10 +405,12 @@ class VoiceController:
         if not win:
             print("  [ERROR] Window not found")
             return False
-        x = win.left + int(win.width * pos[0])
-        y = win.top + int(win.height * pos[1])
+        left, top, width, height = self._win_rect
+        x = left + int(width * pos[0])
+        y = top + int(height * pos[1])
         self.activate_window(win)
-        pyautogui.click(x, y)
+        if send_click is None or not send_click(x, y):
+            pyautogui.click(x, y)
         print(f"  [CLICK] ({x}, {y})")
         return True
 
@@ -254,22 +424,54 @@ class VoiceController:
         else:
             duration = KEY_TAP_DURATION
         
-        # Press and release the key (non-blocking for steering)
-        keyboard.press(key)
-        time.sleep(duration)
-        keyboard.release(key)
+        # Press now, release after duration on the release thread (non-blocking)
+        self.hold_key(key, duration)
         print(f"  [KEY] {cmd_name} ({duration}s)")
         return True
 
     def steer(self, direction):
-        """Steer left or right - direct key press for reliability"""
+        """Steer left or right - press now, release after STEER_HOLD_DURATION"""
         key = Key.left if direction == "left" else Key.right
-        # Direct press without threading for more reliable response
-        keyboard.press(key)
-        time.sleep(STEER_HOLD_DURATION)
-        keyboard.release(key)
+        self.hold_key(key, STEER_HOLD_DURATION)
         print(f"  [STEER] {direction}")
 
+    def hold_key(self, key, duration, then=None):
+        """
+        Press key and return at once; the release thread lets go after duration,
+        then calls then() if given
+        """
+        deadline = time.monotonic() + duration
+        with self._release_cond:
+            keyboard.press(key)
+            held = self._held.get(key)
+            if held is None:
+                held = self._held[key] = [deadline, []]
+            elif deadline > held[0]:
+                held[0] = deadline  # A longer hold of a pressed key extends it
+            if then is not None:
+                held[1].append(then)
+            heapq.heappush(self._release_heap, (deadline, next(self._release_seq), key))
+            self._release_cond.notify()
+
+    def _key_release_worker(self):
+        cond = self._release_cond
+        heap = self._release_heap
+        while True:
+            with cond:
+                while True:
+                    timeout = heap[0][0] - time.monotonic() if heap else None
+                    if timeout is not None and timeout <= 0:
+                        break
+                    cond.wait(timeout)
+                deadline, _, key = heapq.heappop(heap)
+                held = self._held.get(key)
+                if held is None or held[0] != deadline:
+                    continue  # Superseded by a later hold of the same key
+                del self._held[key]
+                keyboard.release(key)
+            for then in held[1]:
+                then()
+
     def start_acceleration(self):
         """Start holding acceleration key"""
         if not self.accelerating:
@@ -297,8 +499,9 @@ class VoiceController:
         win = self.get_window()
         if not win:
             return False
-        cx = win.left + int(win.width * dial_pos[0])
-        cy = win.top + int(win.height * dial_pos[1])
+        left, top, width, height = self._win_rect
+        cx = left + int(width * dial_pos[0])
+        cy = top + int(height * dial_pos[1])
         drag_amount = 20 if direction == "increase" else -20
         win.activate()
         time.sleep(0.1)
@@ -308,19 +511,20 @@ class VoiceController:
         print(f"  [DRAG] {direction}")
         return True
 
-    def is_duplicate(self, cmd):
-        now = time.time()
-        if cmd == self.last_command and (now - self.last_command_time) < self.cooldown:
-            return True
-        self.last_command = cmd
-        self.last_command_time = now
-        return False
-
     def get_confidence(self, result):
         if "result" in result:
             words = result["result"]
             if words:
-                return sum(w.get("conf", 0) for w in words) / len(words)
+                # Word confidences are at most 1.0: stop (returning 0.0) as soon as
+                # the remaining words can no longer lift the mean to MIN_CONFIDENCE
+                n = len(words)
+                needed = MIN_CONFIDENCE * n
+                total = 0.0
+                for i, w in enumerate(words):
+                    total += w.get("conf", 0)
+                    if total + (n - i - 1) < needed:
+                        return 0.0
+                return total / n
         return 0.0
 
     def launch_game(self):
@@ -345,6 +549,7 @@ class VoiceController:
         self.in_gameplay = False
         subprocess.run('taskkill /F /FI "WINDOWTITLE eq MR RACER*"', shell=True, capture_output=True)
         self.game_active = False
+        self._win = None
         print("  [OK] Closed!")
 
 
@@ -353,187 +558,122 @@ class VoiceController:
         if conf < MIN_CONFIDENCE:
             return False
         
-        if self.is_duplicate(cmd):
+        # Ignore repeats within the cooldown (inlined duplicate check; recognized
+        # commands are interned, so == is a pointer compare)
+        now = time.monotonic()
+        if cmd == self.last_command and (now - self.last_command_time) < self.cooldown:
             return False
+        self.last_command = cmd
+        self.last_command_time = now
         
         print(f"\n{'='*50}")
         print(f"[VOICE] '{cmd}' (conf: {conf:.2f})")
         
         # System commands
-        if cmd in ["open mr racer", "play mr racer", "start mr racer"]:
-            self.launch_game()
-            return True
-        if cmd in ["quit game", "close game"]:
-            self.close_game()
+        handler = self._system_dispatch.get(cmd)
+        if handler:
+            handler()
             return True
         
         if not self.game_active:
             print("  [INFO] Game not running")
             return False
         
-        # Navigation buttons (work on multiple screens)
-        if cmd in NAV_BUTTONS:
-            self.click_at(NAV_BUTTONS[cmd])
-            return True
-        
-        # Main menu buttons
-        if cmd in MAIN_MENU_BUTTONS:
-            self.click_at(MAIN_MENU_BUTTONS[cmd])
-            return True
-        
-        # Game mode selection
-        if cmd in GAME_MODE_BUTTONS:
-            self.click_at(GAME_MODE_BUTTONS[cmd])
-            return True
-        
-        # Mode options (one way / two way)
-        if cmd in MODE_OPTIONS:
-            self.click_at(MODE_OPTIONS[cmd])
-            return True
-        
-        # Start button (to start a race from mode selection)
-        if cmd in ["start", "play"]:
-            self.click_at(START_BUTTON)
-            return True
-        
-        # Settings buttons
-        if cmd in SETTINGS_BUTTONS:
-            self.click_at(SETTINGS_BUTTONS[cmd])
-            return True
-        
-        # Help buttons
-        if cmd in HELP_BUTTONS:
-            self.click_at(HELP_BUTTONS[cmd])
-            return True
-        
-        # Volume controls
-        if cmd == "bg music increase":
-            self.drag_dial(BG_MUSIC_DIAL, "increase")
-            return True
-        if cmd == "bg music decrease":
-            self.drag_dial(BG_MUSIC_DIAL, "decrease")
-            return True
-        if cmd == "sound fx increase":
-            self.drag_dial(SOUND_FX_DIAL, "increase")
-            return True
-        if cmd == "sound fx decrease":
-            self.drag_dial(SOUND_FX_DIAL, "decrease")
-            return True
-        
-        # Gameplay buttons (click) - only pause uses screen click
-        if cmd in GAMEPLAY_BUTTONS:
-            self.click_at(GAMEPLAY_BUTTONS[cmd])
-            return True
-        
-        # START RACE - begin with acceleration held
-        if cmd in ["start race", "go", "race"]:
-            self.start_acceleration()
-            return True
-        
-        # BRAKE - stop acceleration, press brake, then resume acceleration
-        if cmd == "brake":
-            self.stop_acceleration()
-            keyboard.press(Key.down)
-            time.sleep(KEY_TAP_DURATION)
-            keyboard.release(Key.down)
-            print("  [KEY] brake -> 'down'")
-            # Resume acceleration after braking
-            time.sleep(0.1)
-            self.resume_acceleration()
-            return True
-        
-        # PAUSE GAME - stop acceleration and click pause button
-        if cmd in ["stop", "pause game", "pause"]:
-            self.stop_acceleration()
-            self.in_gameplay = False
-            self.click_at(GAMEPLAY_BUTTONS["pause"])
-            return True
-        
-        # PAUSE MENU BUTTONS
-        if cmd == "continue" or cmd == "resume":
-            self.click_at(PAUSE_MENU_BUTTONS["continue"])
-            time.sleep(0.3)
-            self.start_acceleration()
-            return True
-        
-        if cmd == "restart":
-            self.click_at(PAUSE_MENU_BUTTONS["restart"])
-            time.sleep(0.5)
-            self.start_acceleration()
-            return True
-        
-        # Settings from pause menu
-        if cmd == "settings" and not self.in_gameplay:
-            self.click_at(PAUSE_MENU_BUTTONS["settings"])
-            return True
-        
-        if cmd == "main menu":
-            self.in_gameplay = False
-            self.click_at(PAUSE_MENU_BUTTONS["main menu"])
-            return True
-        
-        # Camera in pause menu (different from gameplay camera key)
-        if cmd == "camera" and not self.in_gameplay:
-            self.click_at(PAUSE_MENU_BUTTONS["camera"])
-            return True
-        
-        # Confirmation dialog (Yes/No)
-        if cmd == "yes":
-            self.click_at(CONFIRM_BUTTONS["yes"])
-            return True
-        
-        if cmd == "no":
-            self.click_at(CONFIRM_BUTTONS["no"])
-            return True
-        
-        # Result/Mission Failed screen buttons
-        if cmd == "home":
-            self.in_gameplay = False
-            self.click_at(RESULT_SCREEN_BUTTONS["home"])
-            return True
-        
-        if cmd == "replay":
-            self.click_at(RESULT_SCREEN_BUTTONS["replay"])
-            time.sleep(0.5)
-            self.start_acceleration()
-            return True
-        
-        # Garage from result screen (different position than main menu)
-        if cmd == "garage" and not self.in_gameplay:
-            self.click_at(RESULT_SCREEN_BUTTONS["garage"])
-            return True
-        
-        # Gameplay keyboard controls - other actions (left, right, horn, camera)
-        if cmd in GAMEPLAY_KEYS and cmd not in ["brake", "accelerate", "gas"]:
-            self.press_key(GAMEPLAY_KEYS[cmd], cmd)
-            return True
-        
-        # Accelerate/gas - start acceleration if not already
-        if cmd in ["accelerate", "gas"]:
-            self.start_acceleration()
-            return True
-        
-        # Release steering / straight - no key needed, just stop pressing
-        if cmd in ["straight", "release"]:
-            print("  [RELEASE] Steering centered (release keys)")
+        handler = self._dispatch.get(cmd)
+        if handler:
+            handler()
             return True
         
         return False
 
+    def brake(self):
+        """BRAKE - stop acceleration, tap brake, then resume acceleration"""
+        self.stop_acceleration()
+        # Acceleration resumes once the release thread lets go of Down
+        self.hold_key(Key.down, KEY_TAP_DURATION, then=self.resume_acceleration)
+        print("  [KEY] brake -> 'down'")
+
+    def pause_game(self):
+        """PAUSE GAME - stop acceleration and click pause button"""
+        self.stop_acceleration()
+        self.in_gameplay = False
+        self.click_at(GAMEPLAY_BUTTONS["pause"])
+
+    def resume_race(self):
+        """Pause menu CONTINUE, then accelerate again"""
+        self.click_at(PAUSE_MENU_BUTTONS["continue"])
+        time.sleep(0.3)
+        self.start_acceleration()
+
+    def restart_race(self):
+        """Pause menu RESTART, then accelerate again"""
+        self.click_at(PAUSE_MENU_BUTTONS["restart"])
+        time.sleep(0.5)
+        self.start_acceleration()
+
+    def open_main_menu(self):
+        """Pause menu MAIN MENU"""
+        self.in_gameplay = False
+        self.click_at(PAUSE_MENU_BUTTONS["main menu"])
+
+    def camera(self):
+        """Camera button in pause menu, C key during gameplay"""
+        if not self.in_gameplay:
+            self.click_at(PAUSE_MENU_BUTTONS["camera"])
+        else:
+            self.press_key(GAMEPLAY_KEYS["camera"], "camera")
+
+    def go_home(self):
+        """Result/Mission Failed screen HOME"""
+        self.in_gameplay = False
+        self.click_at(RESULT_SCREEN_BUTTONS["home"])
+
+    def replay_race(self):
+        """Result/Mission Failed screen REPLAY, then accelerate again"""
+        self.click_at(RESULT_SCREEN_BUTTONS["replay"])
+        time.sleep(0.5)
+        self.start_acceleration()
+
+    def release_steering(self):
+        """Release steering / straight - no key needed, just stop pressing"""
+        print("  [RELEASE] Steering centered (release keys)")
+
     def audio_callback(self, indata, frames, time_info, status):
-        self.audio_queue.put(bytes(indata))
+        # Copy into the next ring slot: no per-block bytes object on the audio thread
+        off = self._ring_off
+        n = len(indata)
+        self._ring_view[off:off + n] = indata
+        self._ring_off = (off + self._slot_bytes) % len(self._ring)
+        self._buf.append((off, n))
+        self._buf_evt.set()
+
+    def next_audio(self):
+        """
+        Block until the callback has delivered audio, then return every pending
+        block joined, so a backlog costs one AcceptWaveform/result parse, not one per block
+        """
+        while not self._buf:
+            self._buf_evt.wait()
+            self._buf_evt.clear()
+        chunks = []
+        while self._buf:
+            off, n = self._buf.popleft()
+            chunks.append(self._ring_view[off:off + n])
+        # One bytes copy per batch (Vosk's AcceptWaveform takes bytes)
+        return b"".join(chunks)
 
     def download_model(self):
         p = "vosk-model-small-en-us-0.15"
         if os.path.exists(p):
             return p
         print("\nDownloading model...")
-        import urllib.request, zipfile
-        urllib.request.urlretrieve(
-            "https://alphacephei.com/vosk/models/vosk-model-small-en-us-0.15.zip", "m.zip")
-        with zipfile.ZipFile("m.zip", 'r') as z:
+        import io, urllib.request, zipfile
+        # Extract straight from memory - no temporary m.zip written and deleted
+        with urllib.request.urlopen(
+                "https://alphacephei.com/vosk/models/vosk-model-small-en-us-0.15.zip") as resp:
+            buf = io.BytesIO(resp.read())
+        with zipfile.ZipFile(buf, 'r') as z:
             z.extractall(".")
-        os.remove("m.zip")
         return p
 
     def run(self):
@@ -582,24 +722,25 @@ class VoiceController:
         
         vosk.SetLogLevel(-1)
         model = vosk.Model(self.download_model())
-        recognizer = vosk.KaldiRecognizer(model, 16000, json.dumps(self.get_all_commands()))
+        recognizer = vosk.KaldiRecognizer(model, SAMPLE_RATE, _ALL_COMMANDS_JSON)
         recognizer.SetWords(True)
         
         try:
-            with sd.RawInputStream(samplerate=16000, blocksize=1600,
+            with sd.RawInputStream(samplerate=SAMPLE_RATE, blocksize=AUDIO_BLOCKSIZE,
                                    dtype='int16', channels=1,
                                    callback=self.audio_callback):
                 last_steer_time = 0
                 last_partial = ""
                 
                 while True:
-                    data = self.audio_queue.get()
-                    now = time.time()
+                    data = self.next_audio()
+                    now = time.monotonic()
                     
                     # Process audio
                     if recognizer.AcceptWaveform(data):
-                        result = json.loads(recognizer.Result())
+                        result = self._decode(recognizer.Result())
                         text = result.get("text", "").strip()
+                        text = _VOCAB.get(text, text)
                         if text:
                             conf = self.get_confidence(result)
                             # Handle steering from final results too
@@ -610,18 +751,14 @@ class VoiceController:
                                     last_steer_time = now
                             elif text == "brake" and self.in_gameplay:
                                 print(f"[BRAKE]")
-                                self.stop_acceleration()
-                                keyboard.press(Key.down)
-                                time.sleep(KEY_TAP_DURATION)
-                                keyboard.release(Key.down)
-                                self.resume_acceleration()
+                                self.brake()
                             else:
                                 self.execute_command(text, conf)
                         last_partial = ""
                     else:
                         # Check partial results for faster steering
-                        partial = json.loads(recognizer.PartialResult())
-                        partial_text = partial.get("partial", "").strip()
+                        partial_text = read_partial_text(recognizer.PartialResult())
+                        partial_text = _VOCAB.get(partial_text, partial_text)
                         
                         # Only act on new partial results
                         if partial_text and partial_text != last_partial:
@@ -632,11 +769,7 @@ class VoiceController:
                                     last_steer_time = now
                             elif partial_text == "brake" and self.in_gameplay:
                                 print(f"[FAST-BRAKE]")
-                                self.stop_acceleration()
-                                keyboard.press(Key.down)
-                                time.sleep(KEY_TAP_DURATION)
-                                keyboard.release(Key.down)
-                                self.resume_acceleration()
+                                self.brake()
                             last_partial = partial_text
                             
         except KeyboardInterrupt:
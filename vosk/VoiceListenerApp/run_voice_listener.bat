@@ -21,7 +21,7 @@ python -c "import vosk" >nul 2>&1
 if errorlevel 1 (
     echo ERROR: VOSK library not installed
     echo Installing required packages...
-    pip install vosk pyaudio
+    pip install vosk sounddevice numpy
     if errorlevel 1 (
         echo Failed to install packages
         pause
@@ -49,23 +49,22 @@ if ($LASTEXITCODE -eq 0) {
 
 Write-Host ""
 
-# Test 3: Check PyAudio
-Write-Host "[TEST 3] Checking PyAudio library..." -ForegroundColor Cyan
+# Test 3: Check sounddevice
+Write-Host "[TEST 3] Checking sounddevice library..." -ForegroundColor Cyan
 Write-Host ""
 
-$pyaudioTest = python -c "import pyaudio; print('OK')" 2>&1
+$sounddeviceTest = python -c "import sounddevice; print('OK')" 2>&1
 if ($LASTEXITCODE -eq 0) {
-    Write-Host "  ✓ PyAudio library found" -ForegroundColor Green
+    Write-Host "  ✓ sounddevice library found" -ForegroundColor Green
 } else {
-    Write-Host "  ✗ PyAudio library not installed" -ForegroundColor Red
-    Write-Host "    Installing PyAudio..." -ForegroundColor Yellow
-    pip install pyaudio
+    Write-Host "  ✗ sounddevice library not installed" -ForegroundColor Red
+    Write-Host "    Installing sounddevice..." -ForegroundColor Yellow
+    pip install sounddevice
     if ($LASTEXITCODE -eq 0) {
-        Write-Host "  ✓ PyAudio installed successfully" -ForegroundColor Green
+        Write-Host "  ✓ sounddevice installed successfully" -ForegroundColor Green
     } else {
-        Write-Host "  ✗ Failed to install PyAudio" -ForegroundColor Red
+        Write-Host "  ✗ Failed to install sounddevice" -ForegroundColor Red
         Write-Host "    You may need to install it manually" -ForegroundColor Yellow
-        Write-Host "    See: https://www.lfd.uci.edu/~gohlke/pythonlibs/#pyaudio" -ForegroundColor Yellow
     }
 }
 
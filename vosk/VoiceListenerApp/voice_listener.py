@@ -6,32 +6,203 @@ Continuously listens to microphone and writes recognized text to file
 
 import sys
 import os
+import gc
 import json
+import re
 import signal
+import threading
+import time
+from collections import deque
+from functools import lru_cache
 
 # Check for required modules
 try:
     from vosk import Model, KaldiRecognizer
-    import pyaudio
+    import sounddevice as sd
+    import numpy as np
 except ImportError as e:
     print(f"ERROR: Required module not found: {e}")
     print("Please install required packages:")
-    print("  pip install vosk pyaudio")
+    print("  pip install vosk sounddevice numpy")
     sys.exit(1)
 
+# orjson parses faster when installed; only used when the fast field read can't be
+try:
+    from orjson import loads as _loads
+except ImportError:
+    from json import loads as _loads
+
 # Configuration - OPTIMIZED FOR LOW LATENCY
 MODEL_PATH = "vosk-model-small-en-in-0.4"  # Changed to English India
 OUTPUT_FILE = "voice_listener.txt"
 SAMPLE_RATE = 16000
-BUFFER_SIZE = 4096  # Reduced from 8192 for faster response
-CHUNK_SIZE = 2048   # Reduced from 4096 for lower latency
+# 20ms blocks with PortAudio's low-latency setting. Smaller blocks risk input
+# overflows on slow machines: if the reported stream latency is well above
+# 20ms, raise CHUNK_SIZE to match it
+CHUNK_SIZE = 320    # Reduced from 2048 (128ms) for lower latency
+AUDIO_SLOTS = 200   # Chunks the audio ring buffer holds (~4s)
+PARTIAL_PRINT_INTERVAL = 0.05  # Seconds between partial-result console updates
+
+# Silence gate: audio quieter than this (mean absolute int16 amplitude) is
+# not decoded. Decoding continues for SILENCE_HANGOVER seconds after the last
+# loud chunk so Kaldi still sees the trailing silence that ends a phrase, and
+# the last PREROLL_SAMPLES of skipped audio are fed ahead of the next loud
+# one so the start of a word is not cut off
+SILENCE_LEVEL = 120     # Above a quiet room's floor (~20-60), below quiet speech; tune per microphone
+SILENCE_HANGOVER = 1.0
+PREROLL_SAMPLES = SAMPLE_RATE * 3 // 10  # 300ms
+
+# "text" / "partial" fields of Vosk's Result() / PartialResult() JSON, read
+# directly (Vosk always writes '"key" : "value"') instead of parsing the string
+_TEXT_KEY = '"text" : "'
+_PARTIAL_KEY = '"partial" : "'
+# Length of Vosk's PartialResult() with nothing recognized yet: '{\n  "partial" : ""\n}'
+_EMPTY_PARTIAL_LEN = 20
+
+
+def _json_field(raw, key):
+    """
+    String field of a Vosk result, sliced out between two str.find scans;
+    escaped characters or any other layout fall back to a full JSON parse
+    """
+    start = raw.find(key)
+    if start >= 0:
+        start += len(key)
+        end = raw.find('"', start)
+        if end >= 0 and "\\" not in raw:
+            return raw[start:end]
+    try:
+        value = _loads(raw).get(key[1:key.index('"', 1)], "")
+    except (ValueError, AttributeError):
+        return ""
+    return value if isinstance(value, str) else ""
+
+
+@lru_cache(maxsize=128)
+def _result_text(raw):
+    """Lowercased text of a Result() string (memoized: the closed grammar makes results recur)"""
+    text = _json_field(raw, _TEXT_KEY).lower().strip()
+    return _INTERNED.get(text, text)
+
+
+# Grammar for better recognition of game commands
+# This helps distinguish "two" from "to" or "too"
+_GRAMMAR_LIST = (
+    "login", "sign in", "signup", "register", "sign up",
+    "dashboard", "go home", "open dashboard",
+    "settings", "open settings", "go to settings",
+    "profile", "go to profile", "open profile",
+    "voice commands", "help", "show commands",
+    "add game", "new game",
+    "logout", "sign out", "log out",
+    "close", "close window", "minimize", "maximize",
+    "exit", "quit", "close app", "close application",
+    "open mr racer", "play mr racer", "launch mr racer", "start mr racer",
+    "open subway surfers", "play subway surfers", "launch subway surfers", "start subway surfers",
+    "open subway", "play subway",
+    "open game one", "play game one", "start game one", "launch game one",
+    "open game 1", "play game 1", "start game 1", "launch game 1",
+    "open game two", "play game two", "start game two", "launch game two",
+    "open game 2", "play game 2", "start game 2", "launch game 2",
+    "open game three", "play game three", "start game three", "launch game three",
+    "open game 3", "play game 3", "start game 3", "launch game 3",
+    "open game four", "play game four", "start game four", "launch game four",
+    "open game 4", "play game 4", "start game 4", "launch game 4",
+    "open game five", "play game five", "start game five", "launch game five",
+    "open game 5", "play game 5", "start game 5", "launch game 5",
+    "manual login", "manual",
+    "face login", "face",
+    "voice login", "record voice", "record",
+    "forgot password", "reset password",
+    "capture face", "take photo",
+    "create account",
+    "[unk]"
+)
+_GRAMMAR_JSON = json.dumps(_GRAMMAR_LIST)
+
+# Recognized commands mapped to one interned copy each, so the repeat check
+# against last_written is usually an identity match
+_INTERNED = {c: sys.intern(c) for c in _GRAMMAR_LIST}
+
+# Output-file bytes for every grammar phrase, encoded once up front
+_PAYLOADS = {c: c.encode("utf-8") for c in _GRAMMAR_LIST}
+
+# One compiled matcher over every command: partials are only shown
+# once they contain a whole command, not for every chunk of speech
+_COMMAND_RE = re.compile(r"\b(?:%s)\b" % "|".join(
+    re.escape(c) for c in sorted(_GRAMMAR_LIST, key=len, reverse=True) if c != "[unk]"),
+    re.IGNORECASE)
 
 # Global variables for cleanup
-audio = None
 stream = None
+out_fd = None
 running = True
 
 
+class AudioBuffer:
+    """
+    Microphone chunks handed from the PortAudio callback thread to the
+    recognition loop. Each chunk is copied into a preallocated ring, so the
+    audio thread allocates nothing; the oldest chunks are dropped if the
+    loop falls AUDIO_SLOTS chunks behind
+    """
+    
+    def __init__(self, chunk_bytes, slots):
+        self.chunk_bytes = chunk_bytes
+        self.ring = bytearray(chunk_bytes * slots)
+        self.view = memoryview(self.ring)
+        self.offset = 0
+        self.pending = deque(maxlen=slots)  # (offset, length) of unread chunks
+        self.ready = threading.Event()
+    
+    def callback(self, indata, frames, time_info, status):
+        """sounddevice RawInputStream callback"""
+        off = self.offset
+        n = len(indata)
+        self.view[off:off + n] = indata
+        self.offset = (off + self.chunk_bytes) % len(self.ring)
+        self.pending.append((off, n))
+        self.ready.set()
+    
+    def read(self, timeout):
+        """
+        Every unread chunk joined into one bytes object (what AcceptWaveform
+        takes), or None after timeout. A backlog built up while Kaldi was
+        decoding goes to the recognizer in one call
+        """
+        while not self.pending:
+            if not self.ready.wait(timeout):
+                return None
+            self.ready.clear()
+        chunks = []
+        while self.pending:
+            off, n = self.pending.popleft()
+            chunks.append(self.view[off:off + n])
+        return b"".join(chunks)
+
+
+def raise_priority():
+    """
+    Run above normal priority so the game being controlled doesn't delay the
+    audio callback and recognition loop (needs administrator rights for
+    anything above "high" on Windows, and root / CAP_SYS_NICE on Linux)
+    """
+    try:
+        try:
+            import psutil
+            psutil.Process().nice(psutil.HIGH_PRIORITY_CLASS if os.name == "nt" else -10)
+        except ImportError:
+            if os.name == "nt":
+                import ctypes
+                kernel32 = ctypes.windll.kernel32
+                kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), 0x00000080)  # HIGH_PRIORITY_CLASS
+            else:
+                os.nice(-10)
+        print("[VOICE] Process priority raised")
+    except Exception as e:
+        print(f"[VOICE] Could not raise process priority: {e}")
+
+
 def signal_handler(sig, frame):
     """Handle shutdown signals gracefully"""
     global running
@@ -41,7 +212,7 @@ def signal_handler(sig, frame):
 
 def main():
     """Main voice listener loop"""
-    global audio, stream
+    global stream, out_fd
     
     print("=" * 60)
     print("VOSK Voice Listener for Gaming Through Voice Recognition")
@@ -52,6 +223,8 @@ def main():
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
+    raise_priority()
+    
     # Check if model exists
     if not os.path.exists(MODEL_PATH):
         print(f"ERROR: VOSK model folder not found: {MODEL_PATH}")
@@ -70,39 +243,18 @@ def main():
         recognizer = KaldiRecognizer(model, SAMPLE_RATE)
         
         # Set grammar for better recognition of game commands
-        # This helps distinguish "two" from "to" or "too"
-        grammar = json.dumps([
-            "login", "sign in", "signup", "register", "sign up",
-            "dashboard", "go home", "open dashboard",
-            "settings", "open settings", "go to settings",
-            "profile", "go to profile", "open profile",
-            "voice commands", "help", "show commands",
-            "add game", "new game",
-            "logout", "sign out", "log out",
-            "close", "close window", "minimize", "maximize",
-            "exit", "quit", "close app", "close application",
-            "open mr racer", "play mr racer", "launch mr racer", "start mr racer",
-            "open subway surfers", "play subway surfers", "launch subway surfers", "start subway surfers",
-            "open subway", "play subway",
-            "open game one", "play game one", "start game one", "launch game one",
-            "open game 1", "play game 1", "start game 1", "launch game 1",
-            "open game two", "play game two", "start game two", "launch game two",
-            "open game 2", "play game 2", "start game 2", "launch game 2",
-            "open game three", "play game three", "start game three", "launch game three",
-            "open game 3", "play game 3", "start game 3", "launch game 3",
-            "open game four", "play game four", "start game four", "launch game four",
-            "open game 4", "play game 4", "start game 4", "launch game 4",
-            "open game five", "play game five", "start game five", "launch game five",
-            "open game 5", "play game 5", "start game 5", "launch game 5",
-            "manual login", "manual",
-            "face login", "face",
-            "voice login", "record voice", "record",
-            "forgot password", "reset password",
-            "capture face", "take photo",
-            "create account",
-            "[unk]"
-        ])
-        recognizer.SetGrammar(grammar)
+        recognizer.SetGrammar(_GRAMMAR_JSON)
+        
+        # Only the best-path text is used: no alternatives or word timings
+        recognizer.SetMaxAlternatives(0)
+        recognizer.SetWords(False)
+        recognizer.SetPartialWords(False)
+        
+        # Warm up: decode one second of silence so Kaldi's first-call setup
+        # doesn't delay the first real command, then start from a clean state
+        recognizer.AcceptWaveform(bytes(SAMPLE_RATE * 2))
+        recognizer.Result()
+        recognizer.Reset()
         
         print("[VOICE] Model loaded successfully with game command grammar")
         print()
@@ -112,20 +264,22 @@ def main():
         sys.exit(1)
     
     try:
-        # Initialize PyAudio
+        # Initialize audio buffer (filled from the PortAudio callback thread)
         print("[VOICE] Initializing audio system...")
-        audio = pyaudio.PyAudio()
+        audio_buffer = AudioBuffer(CHUNK_SIZE * 2, AUDIO_SLOTS)
         
         # Open microphone stream
         print(f"[VOICE] Opening microphone stream ({SAMPLE_RATE}Hz, mono, 16-bit)")
-        stream = audio.open(
-            format=pyaudio.paInt16,
+        stream = sd.RawInputStream(
+            samplerate=SAMPLE_RATE,
+            blocksize=CHUNK_SIZE,
+            dtype="int16",
             channels=1,
-            rate=SAMPLE_RATE,
-            input=True,
-            frames_per_buffer=BUFFER_SIZE
+            latency="low",
+            callback=audio_buffer.callback
         )
-        print("[VOICE] Microphone stream opened successfully")
+        stream.start()
+        print(f"[VOICE] Microphone stream opened successfully (input latency {stream.latency * 1000:.0f}ms)")
         print()
         
     except Exception as e:
@@ -138,10 +292,10 @@ def main():
         print()
         sys.exit(1)
     
-    # Create empty output file
+    # Create empty output file, kept open for the whole session so each
+    # recognized command is a truncate + write, not an open/write/close
     try:
-        with open(OUTPUT_FILE, "w") as f:
-            f.write("")
+        out_fd = os.open(OUTPUT_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
         print(f"[VOICE] Output file created: {OUTPUT_FILE}")
     except Exception as e:
         print(f"ERROR: Could not create output file: {e}")
@@ -157,25 +311,72 @@ def main():
     
     # Main recognition loop - OPTIMIZED FOR LOW LATENCY
     last_written = ""  # Track last written command to avoid duplicate writes
+    last_partial_time = 0.0
+    write = sys.stdout.write  # Bound once for the partial-result line
+    flush = sys.stdout.flush
+    # Recognizer calls bound once: vosk already passes the bytes to Kaldi
+    # without copying and releases the GIL inside the call (cffi)
+    accept_waveform = recognizer.AcceptWaveform
+    get_result = recognizer.Result
+    get_partial = recognizer.PartialResult
+    preroll = deque()  # Recent silent audio, not yet decoded
+    preroll_bytes = 0
+    preroll_limit = PREROLL_SAMPLES * 2  # int16
+    last_voice_time = 0.0
+    
+    # Setup garbage collected, and everything still alive moved out of the
+    # collector's generations so collections during the loop don't rescan it
+    gc.collect()
+    gc.freeze()
     
     try:
         while running:
-            # Read audio chunk from microphone (smaller chunks = faster response)
-            data = stream.read(CHUNK_SIZE, exception_on_overflow=False)
+            # Audio captured since the last pass (smaller chunks = faster response);
+            # the timeout lets a shutdown signal end the loop while it is quiet
+            data = audio_buffer.read(timeout=0.5)
+            if data is None:
+                continue
+            
+            # Skip decoding while the room is quiet
+            now = time.monotonic()
+            if np.abs(np.frombuffer(data, dtype=np.int16).astype(np.int32)).mean() < SILENCE_LEVEL:
+                if now - last_voice_time > SILENCE_HANGOVER:
+                    # Keep only the newest preroll_limit bytes (reads vary in size)
+                    preroll.append(data)
+                    preroll_bytes += len(data)
+                    excess = preroll_bytes - preroll_limit
+                    while excess > 0:
+                        head = preroll[0]
+                        if len(head) <= excess:
+                            preroll.popleft()
+                            excess -= len(head)
+                        else:
+                            preroll[0] = head[excess:]
+                            excess = 0
+                    preroll_bytes = min(preroll_bytes, preroll_limit)
+                    continue
+            else:
+                last_voice_time = now
+                if preroll:
+                    preroll.append(data)
+                    data = b"".join(preroll)
+                    preroll.clear()
+                    preroll_bytes = 0
             
             # Feed audio to recognizer
-            if recognizer.AcceptWaveform(data):
+            if accept_waveform(data):
                 # Complete phrase detected
-                result = json.loads(recognizer.Result())
-                text = result.get("text", "").lower().strip()
+                text = _result_text(get_result())
                 
                 if text and text != last_written:
                     # Write recognized text to file immediately
                     try:
-                        # Use unbuffered write for instant file update
-                        with open(OUTPUT_FILE, "w", buffering=1) as f:
-                            f.write(text)
-                            f.flush()  # Force immediate write to disk
+                        # Unbuffered write through the open fd (no fsync: the
+                        # reader polls the file through the OS cache)
+                        os.ftruncate(out_fd, 0)
+                        os.lseek(out_fd, 0, os.SEEK_SET)
+                        payload = _PAYLOADS.get(text)
+                        os.write(out_fd, payload if payload is not None else text.encode("utf-8"))
                         print(f"[VOICE] Recognized: '{text}'")
                         last_written = text
                     except Exception as e:
@@ -183,16 +384,24 @@ def main():
             
             # Process partial results for faster command detection
             else:
-                partial = json.loads(recognizer.PartialResult())
-                partial_text = partial.get("partial", "").lower().strip()
+                raw = get_partial()
+                if len(raw) <= _EMPTY_PARTIAL_LEN:
+                    continue  # Silence/noise: nothing to show
+                partial_text = _json_field(raw, _PARTIAL_KEY)
                 
-                # If partial result looks like a complete command, write it immediately
-                # This provides faster response for short commands
-                if partial_text and len(partial_text.split()) >= 1:
-                    # Check if it's a known command pattern (optional optimization)
-                    if partial_text != last_written:
-                        # Show partial for debugging
-                        print(f"[VOICE] Partial: {partial_text}", end="\r")
+                # Show partials that already contain a known command (for debugging);
+                # cheapest checks first, lowercase only what gets through
+                if not partial_text or not _COMMAND_RE.search(partial_text):
+                    continue
+                partial_text = partial_text.lower().strip()
+                if partial_text != last_written:
+                    now = time.monotonic()
+                    if now - last_partial_time >= PARTIAL_PRINT_INTERVAL:
+                        write("[VOICE] Partial: ")
+                        write(partial_text)
+                        write("\r")
+                        flush()
+                        last_partial_time = now
     
     except KeyboardInterrupt:
         print("\n[VOICE] Keyboard interrupt received")
@@ -204,16 +413,15 @@ def main():
         
         if stream is not None:
             try:
-                stream.stop_stream()
+                stream.stop()
                 stream.close()
                 print("[VOICE] Audio stream closed")
             except:
                 pass
         
-        if audio is not None:
+        if out_fd is not None:
             try:
-                audio.terminate()
-                print("[VOICE] PyAudio terminated")
+                os.close(out_fd)
             except:
                 pass
         